@@ -1,17 +1,32 @@
 
-from .solver import generate_tests, print_tests, print_test, verify_test
-from .options import Options, RefinementStrategy
-from .utils import CommandDict, Test, TestSuite
+from .solver import generate_tests, iter_tests, append_tests, print_tests, print_test, verify_test, compile_spec, \
+    CompiledSpec, GenerationReport, GenerationStatus
+from .options import Options, RefinementStrategy, TemporalEncoding, EvaluationStrategy, Parser, CommandSubset, TimelineEncoding
+from .utils import CommandDict, Test, TestSuite, diversity
+from .commands import Session
 
 __all__ = [
     "generate_tests",
+    "iter_tests",
+    "append_tests",
     "print_tests",
     "print_test",
     "CommandDict",
     "Test",
     "TestSuite",
+    "diversity",
     "Options",
     "RefinementStrategy",
-    "verify_test"
+    "TemporalEncoding",
+    "EvaluationStrategy",
+    "Parser",
+    "CommandSubset",
+    "TimelineEncoding",
+    "verify_test",
+    "compile_spec",
+    "CompiledSpec",
+    "GenerationReport",
+    "GenerationStatus",
+    "Session"
 ]
 
@@ -1,22 +1,29 @@
 """
-This module provides data structures and functions for initializing the variable:
+This module provides data structures and functions for creating a session:
 
-    command_dictionary: FSWCommandDictionary
+    Session
+
+which stores the contents of the command and enumeration XML files defining the commands
+and the enumeration types of the command arguments, in the variable:
 
-which will store the contents of the command and enumeration XML files defining the commands
-and the enumeration types of the command arguments. This variable is visible throughout the
-application code as a global variable.
+    command_dictionary: FSWCommandDictionary
 
-It is necessary to make it a global variable initialized as the first thing in order to
-make the Z3 SMT solver able to construct the corresponding type of commands.
+together with the Z3 type of commands, `Command`, and the `timeline` built from it, as well as
+the Z3 type of command names, `CommandName`, and the `skeleton` built from it, and the
+`flat_timeline` representing the timeline by scalar variables instead.
+These variables are visible throughout the application code as global variables,
+referring to the current session. The current session is created from the configuration
+file when first used, unless a session has been created and activated explicitly.
 """
 
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum
+import itertools
 import json
 import random
 import string
-from typing import Callable, Optional
+from typing import Callable, Iterator, Optional
 import typing
 from abc import ABC, abstractmethod
 from pprint import pprint
@@ -25,16 +32,7 @@ from z3 import *
 
 from fuzz.gencmds import generate_commands
 from fuzz.utils import inspect, error, headline, unsigned_int_bounds, signed_int_bounds, float_bounds
-from fuzz.options import Options
-
-
-# ==================================================================
-# The fundamental data types used by Z3, name the type of command
-# and the timeline representing the list of generated commands.
-# ==================================================================
-
-Command: Datatype = None
-timeline: Function = None
+from fuzz.options import Options, TimelineEncoding
 
 
 # ==================================================================
@@ -223,21 +221,22 @@ class FSWStringArgument(FSWArgument):
 class FSWEnumArgument(FSWArgument):
     """An enumeration type argument."""
 
-    def __init__(self, name: str, length: int, typ: str, enum_values: list[str]):
+    def __init__(self, name: str, length: int, typ: str, enum_values: list[str], dictionary: 'FSWCommandDictionary'):
         super().__init__(name, length)
         self.typ = typ
         self.enum_values = enum_values
+        self.dictionary = dictionary
 
     def random_python_value(self) -> str:
         return random.choice(self.enum_values)
 
     def random_value(self) -> ExprRef:
         value = self.random_python_value()
-        datatype = command_dictionary.get_enum_datatype(self.typ)
+        datatype = self.dictionary.get_enum_datatype(self.typ)
         return getattr(datatype, value)
 
     def smt_type(self) -> Sort:
-        return command_dictionary.get_enum_datatype(self.typ)
+        return self.dictionary.get_enum_datatype(self.typ)
 
     def field_type(self) -> FieldType:
         return EnumType(self.typ, self.enum_values)
@@ -262,6 +261,9 @@ class FSWCommand:
 # The command dictionary.
 # ==================================================================
 
+# Name of the constructor representing the commands left out of a `Command` datatype.
+OTHER = 'OTHER'
+
 class FSWCommandDictionary:
     """The key dictionary of commands and their types.
 
@@ -271,20 +273,34 @@ class FSWCommandDictionary:
         spec_file: path to file containing specification of constraints.
         test_suite_size: the number of tests to be generated.
         test_size: the number of commands in a single test.
+        workers: the number of processes generating tests in parallel.
+        seed: the seed from which the per-test random seeds are derived.
+        jsonl_file: path to a JSONL file to which each generated test is appended.
+        number: the number of command dictionaries created before this one, used for naming
+          its enumeration datatypes apart from those of other dictionaries.
         enum_types: mapping from names of enumerated types to the Z3 datatypes.  # TODO
         commands: the commands defined in the XML file, represented as class objects.
+        smt_commands: the commands represented by constructors of the current `Command` datatype.
+        other_commands: the commands represented by the `OTHER` constructor of the current `Command` datatype.
     """
 
-    def __init__(self, enum_dict: dict, cmd_dict: dict, spec_file: Optional[str], test_suite_size: Optional[int], test_size: Optional[int]):
+    def __init__(self, enum_dict: dict, cmd_dict: dict, spec_file: Optional[str], test_suite_size: Optional[int], test_size: Optional[int],
+                 workers: Optional[int] = None, seed: Optional[int] = None, jsonl_file: Optional[str] = None):
         self.enum_dict = enum_dict
         self.cmd_dict = cmd_dict
         self.spec_file = spec_file
         self.test_suite_size = test_suite_size
         self.test_size = test_size
+        self.workers = workers
+        self.seed = seed
+        self.jsonl_file = jsonl_file
+        self.number: int = next(dictionary_count)
         self._validate_dicts()
         self.enum_types: dict[str, Datatype] = {}
         self.commands: list[FSWCommand] = []
         self._initialize()
+        self.smt_commands: list[FSWCommand] = self.commands
+        self.other_commands: list[FSWCommand] = []
 
     def print_dictionaries(self):
         """Prints the enumeration and command dictionaries read in from XML files."""
@@ -333,7 +349,7 @@ class FSWCommandDictionary:
                     argument = FSWStringArgument(name, length)
                 elif typ in self.enum_dict:
                     enum_values = self.enum_dict[typ]
-                    argument = FSWEnumArgument(name, length, typ, enum_values)
+                    argument = FSWEnumArgument(name, length, typ, enum_values, self)
                 else:
                     raise ValueError(f"Unknown type '{typ}' for argument {name} in command {cmd_name}")
                 arguments.append(argument)
@@ -356,25 +372,40 @@ class FSWCommandDictionary:
         """
         return self.enum_types[name]
 
-    def to_smt_type(self) -> Datatype:
-        """Creates and returns the `Command` Z3 type representing the type of commands."""
+    def to_smt_type(self, commands: Optional[list[FSWCommand]] = None, name: str = 'Command') -> Datatype:
+        """Creates and returns the `Command` Z3 type representing the type of commands.
+
+        :param commands: the commands to be represented by a constructor each, all commands if `None`.
+          If some commands are left out, they are represented by one `OTHER` constructor without fields.
+        :param name: the name of the datatype, which must differ from the names of other datatypes,
+          since Z3 identifies datatypes by name.
+        """
+        if commands is None:
+            commands = self.commands
         try:
-            # Declare enumerated types:
+            # Declare enumerated types, once, such that all `Command` datatypes share them.
+            # Z3 identifies datatypes by name, so the names are made unique per dictionary:
             for enum_name, enum_values in self.enum_dict.items():
-                enum_type = Datatype(enum_name)
+                if enum_name in self.enum_types:
+                    continue
+                enum_type = Datatype(enum_name if self.number == 0 else f'{enum_name}_{self.number}')
                 for value in enum_values:
                     enum_type.declare(value)
                 enum_type = enum_type.create()
                 self.add_enum_datatype(enum_name, enum_type)
             # Declare commands:
-            Command = Datatype('Command')
-            for cmd in self.commands:
+            Command = Datatype(name)
+            for cmd in commands:
                 fields = []
                 for arg in cmd.arguments:
                     arg_name = f'{cmd.name}_{arg.name}'
                     smt_type = arg.smt_type()
                     fields.append((arg_name, smt_type))
                 Command.declare(cmd.name, *fields)
+            if len(commands) < len(self.commands):
+                if OTHER in self.cmd_dict:
+                    raise ValueError(f"command name {OTHER} is reserved")
+                Command.declare(OTHER)
             if Options.PRINT_CONSTRAINTS:
                 headline('GENERATED COMMAND DATATYPE')
                 print(Command)
@@ -396,34 +427,50 @@ class FSWCommandDictionary:
         :return: A combined SMT constraint (BoolRef).
         """
         constraints = []
-        for cmd in self.commands:
-            is_cmd = getattr(Command, f'is_{cmd.name}')
+        if use_flat_timeline():
+            constraints += [flat_timeline.domain(t) for t in range(end_time)]
+        for cmd in self.smt_commands:
             for t in range(end_time):
                 cmd_constraints = []
                 for arg in cmd.arguments:
-                    arg_var = getattr(Command, f'{cmd.name}_{arg.name}')(timeline(t))
+                    arg_var = smt_argument(cmd.name, arg.name, t)
                     cmd_constraints.append(arg.smt_constraint(arg_var))
-                command_constraint = Or(Not(is_cmd(timeline(t))), And(cmd_constraints))
+                command_constraint = Or(Not(smt_is_command(cmd.name, t)), And(cmd_constraints))
                 constraints.append(command_constraint)
 
         # Return combined constraints
         return And(constraints) if constraints else BoolVal(True)
 
-    def generate_random_smt_command(self) -> Command:
-        """Generates a random Z3 command. Used for test refinement with Z3."""
-        command: FSWCommand = random.choice(self.commands)
+    def generate_random_smt_command(self, t: int) -> BoolRef:
+        """Generates a constraint stating that the command at a time point is a random command.
+        Used for test refinement with Z3.
+
+        :param t: the time point.
+        """
+        command: FSWCommand = random.choice(self.smt_commands)
         arguments = [arg.random_value() for arg in command.arguments]
-        constructor = getattr(Command, command.name)
-        return constructor(*arguments)
+        return smt_command(command.name, arguments, t)
+
+    def generate_random_dict_command(self, commands: Optional[list[FSWCommand]] = None) -> dict:
+        """generates a random Python command. Used for test refinement with just Python.
 
-    def generate_random_dict_command(self) -> dict:
-        """generates a random Python command. Used for test refinement with just Python."""
-        fsw_command: FSWCommand = random.choice(self.commands)
+        :param commands: the commands to choose from, all commands if `None`.
+        """
+        fsw_command: FSWCommand = random.choice(commands or self.commands)
         command_name = {'name': fsw_command.name}
         arguments = {arg.name: arg.random_python_value() for arg in fsw_command.arguments}
         command = {**command_name, **arguments}
         return command
 
+    def smt_constructor_name(self, cmd_name: str) -> str:
+        """Returns the name of the constructor representing a command in the
+        current `Command` datatype, which is `OTHER` if the command has no constructor.
+
+        :param cmd_name: the command name.
+        :return: the constructor name.
+        """
+        return cmd_name if hasattr(Command, f'is_{cmd_name}') else OTHER
+
     def find_fsw_command(self, cmd_name: str) -> FSWCommand:
         """Finds and returns the FSW command with the given name.
 
@@ -487,37 +534,330 @@ class FSWCommandDictionary:
         return cmd_env
 
 
-def initialize():
-    """ Initialize the `command_dictionary` variable.
+# ==================================================================
+# Flat encoding of the timeline.
+# ==================================================================
+
+class FlatTimeline:
+    """A representation of the timeline by scalar variables, see `TimelineEncoding.FLAT`. The command
+    at a time point is represented by an integer opcode, the index of its constructor in `Command`,
+    and each argument by a variable per time point. Arguments with the same name and type in different
+    commands share the variable, since only one command is issued at each time point.
 
-    It assumes the existence of a configration file in json format.
-    The path to the configuration file is either determined by an environment
-    variable `FUZZ_CONFIG_PATH`, or the default `fuzz_config.json` in the
-    current directory.
+    Attributes:
+        names: the names of the constructors of `Command`, indexed by opcode.
+        opcodes: maps the name of each constructor of `Command` to its opcode.
+        sorts: maps the name of each constructor to a map from its argument names to their Z3 types.
     """
-    global command_dictionary, Command, timeline
-    config_path = os.getenv("FUZZ_CONFIG_PATH", os.path.join(os.getcwd(), "fuzz_config.json"))
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"Configuration file not found at {config_path}")
-    with open(config_path, "r") as config_file:
-        config = json.load(config_file)
-    cmd_files = config.get("cmd_files")
-    if not cmd_files:
-        raise ValueError("'cmd_files' not defined in configuration file {config}\nlocated at {config_path}")
-    spec_file = config.get("spec_file")
-    test_suite_size = config.get("test_suite_size")
-    test_size = config.get("test_size")
-    enum_dict, cmd_dict = generate_commands(cmd_files)
-    command_dictionary = FSWCommandDictionary(enum_dict, cmd_dict, spec_file, test_suite_size, test_size)
-    command_dictionary.print_dictionaries()
-    Command = command_dictionary.to_smt_type()
-    timeline = Function('timeline', IntSort(), Command)
+
+    def __init__(self, Command: Datatype):
+        self.names: list[str] = [Command.constructor(i).name() for i in range(Command.num_constructors())]
+        self.opcodes: dict[str, int] = {name: opcode for opcode, name in enumerate(self.names)}
+        self.sorts: dict[str, dict[str, SortRef]] = {}
+        for i, name in enumerate(self.names):
+            accessors = [Command.accessor(i, j) for j in range(Command.constructor(i).arity())]
+            self.sorts[name] = {accessor.name()[len(name) + 1:]: accessor.range() for accessor in accessors}
+
+    def check_time(self, t: int):
+        """Checks that a time point is an integer, and not a time variable bound by a quantifier.
+
+        :param t: the time point.
+        :raises ValueError: if the time point is not an integer.
+        """
+        if not isinstance(t, int):
+            raise ValueError('the flat timeline encoding requires integer time points, '
+                             'it cannot be combined with the quantified temporal encoding')
+
+    def opcode(self, t: int) -> ArithRef:
+        """Returns the variable representing the opcode of the command at a time point.
+
+        :param t: the time point.
+        :return: the variable.
+        """
+        self.check_time(t)
+        return Int(f'opcode_{t}')
+
+    def domain(self, t: int) -> BoolRef:
+        """Returns the constraint stating that the opcode at a time point is the opcode of a command.
+
+        :param t: the time point.
+        :return: the constraint.
+        """
+        return And(0 <= self.opcode(t), self.opcode(t) < len(self.names))
+
+    def is_command(self, cmd_name: str, t: int) -> BoolRef:
+        """Returns the constraint stating that the command at a time point is a given command.
+
+        :param cmd_name: the name of the constructor of the command.
+        :param t: the time point.
+        :return: the constraint.
+        """
+        return self.opcode(t) == self.opcodes[cmd_name]
+
+    def argument(self, arg_name: str, sort: SortRef, t: int) -> ExprRef:
+        """Returns the variable representing the arguments with a given name and type at a time point.
+
+        :param arg_name: the name of the argument.
+        :param sort: the Z3 type of the argument.
+        :param t: the time point.
+        :return: the variable.
+        """
+        self.check_time(t)
+        return Const(f'{arg_name}_{sort}_{t}', sort)
+
+    def command_argument(self, cmd_name: str, arg_name: str, t: int) -> ExprRef:
+        """Returns the variable representing an argument of a command at a time point.
+
+        :param cmd_name: the name of the constructor of the command.
+        :param arg_name: the name of the argument.
+        :param t: the time point.
+        :return: the variable.
+        """
+        return self.argument(arg_name, self.sorts[cmd_name][arg_name], t)
+
+    def any_argument(self, arg_name: str, t: int) -> ExprRef:
+        """Returns the variable representing an argument common to all commands at a time point.
+
+        :param arg_name: the name of the argument.
+        :param t: the time point.
+        :return: the variable.
+        """
+        for sorts in self.sorts.values():
+            if arg_name in sorts:
+                return self.argument(arg_name, sorts[arg_name], t)
+        raise ValueError(f"Field '{arg_name}' does not exist in any constructor.")
+
+    def evaluate(self, model: ModelRef, t: int) -> tuple[str, dict[str, ExprRef]]:
+        """Returns the command at a time point in a model.
+
+        :param model: the model.
+        :param t: the time point.
+        :return: the name of the constructor of the command, and the values of its arguments.
+        """
+        name = self.names[model.eval(self.opcode(t), model_completion=True).as_long()]
+        arguments = {arg_name: model.eval(self.argument(arg_name, sort, t), model_completion=True)
+                     for arg_name, sort in self.sorts[name].items()}
+        return name, arguments
+
+
+def use_flat_timeline() -> bool:
+    """Returns True iff. the timeline is represented by scalar variables, see `FlatTimeline`."""
+    return Options.TIMELINE_ENCODING == TimelineEncoding.FLAT
+
+
+def smt_is_command(cmd_name: str, t: int) -> BoolRef:
+    """Returns the constraint stating that the command at a time point is a given command.
+
+    :param cmd_name: the name of the constructor of the command.
+    :param t: the time point.
+    :return: the constraint.
+    :raises AttributeError: if the command has no constructor.
+    """
+    if use_flat_timeline():
+        if cmd_name not in flat_timeline.opcodes:
+            raise AttributeError(f'no constructor {cmd_name}')
+        return flat_timeline.is_command(cmd_name, t)
+    return getattr(Command, f'is_{cmd_name}')(timeline(t))
+
+
+def smt_argument(cmd_name: str, arg_name: str, t: int) -> ExprRef:
+    """Returns the value of an argument of a command at a time point.
+
+    :param cmd_name: the name of the constructor of the command.
+    :param arg_name: the name of the argument.
+    :param t: the time point.
+    :return: the value.
+    :raises AttributeError: if the command has no such argument.
+    """
+    if use_flat_timeline():
+        if arg_name not in flat_timeline.sorts.get(cmd_name, {}):
+            raise AttributeError(f'no argument {arg_name} of constructor {cmd_name}')
+        return flat_timeline.command_argument(cmd_name, arg_name, t)
+    return getattr(Command, f'{cmd_name}_{arg_name}')(timeline(t))
+
+
+def smt_command(cmd_name: str, arguments: list[ExprRef], t: int) -> BoolRef:
+    """Returns the constraint stating that the command at a time point is a given command with given arguments.
+
+    :param cmd_name: the name of the constructor of the command.
+    :param arguments: the values of the arguments, in the order they are declared.
+    :param t: the time point.
+    :return: the constraint.
+    """
+    if use_flat_timeline():
+        arg_names = list(flat_timeline.sorts[cmd_name])
+        return And([flat_timeline.is_command(cmd_name, t)] +
+                   [flat_timeline.command_argument(cmd_name, arg_name, t) == value
+                    for arg_name, value in zip(arg_names, arguments)])
+    return timeline(t) == getattr(Command, cmd_name)(*arguments)
 
 
 # ==================================================================
-# Initializing the command dictionary.
+# Sessions.
 # ==================================================================
 
-command_dictionary: FSWCommandDictionary = None
-initialize()
+class Session:
+    """A command dictionary, read from the XML files identified by a configuration file,
+    together with the Z3 `Command` datatype and the `timeline` built from it.
+
+    Attributes:
+        config_path: the path to the configuration file.
+        command_dictionary: the command dictionary.
+        Command: the Z3 datatype of commands.
+        timeline: the Z3 function from time points to commands.
+        CommandName: the Z3 enumeration type of the names of the constructors of `Command`.
+        skeleton: the Z3 function from time points to command names, see `Options.TWO_PHASE_SOLVING`.
+        flat_timeline: the representation of the timeline by scalar variables, see `Options.TIMELINE_ENCODING`.
+        datatypes: the `Command` datatypes created so far, see `select_commands`.
+        selected: the `Command` datatype currently selected, with the datatypes built from it.
+    """
+
+    def __init__(self, config_path: Optional[str] = None):
+        """
+        :param config_path: the path to the configuration file. If `None`, the path is
+            determined by the environment variable `FUZZ_CONFIG_PATH`, or is the default
+            `fuzz_config.json` in the current directory.
+        """
+        if config_path is None:
+            config_path = os.getenv("FUZZ_CONFIG_PATH", os.path.join(os.getcwd(), "fuzz_config.json"))
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(f"Configuration file not found at {config_path}")
+        with open(config_path, "r") as config_file:
+            config = json.load(config_file)
+        cmd_files = config.get("cmd_files")
+        if not cmd_files:
+            raise ValueError(f"'cmd_files' not defined in configuration file {config}\nlocated at {config_path}")
+        spec_file = config.get("spec_file")
+        test_suite_size = config.get("test_suite_size")
+        test_size = config.get("test_size")
+        workers = config.get("workers")
+        seed = config.get("seed")
+        jsonl_file = config.get("jsonl_file")
+        enum_dict, cmd_dict = generate_commands(cmd_files)
+        self.config_path: str = config_path
+        self.command_dictionary = FSWCommandDictionary(enum_dict, cmd_dict, spec_file, test_suite_size, test_size, workers, seed,
+                                                       jsonl_file)
+        self.datatypes: dict[Optional[tuple[frozenset[str], int]], tuple] = {}
+        self.select_commands(None)
+
+    def select_commands(self, cmd_names: Optional[set[str]]):
+        """Selects the commands represented by constructors of the `Command` datatype, and
+        the `timeline`, `CommandName`, `skeleton` and `flat_timeline` built from it, of the session.
+        The datatypes are created the first time a subset is selected.
+
+        :param cmd_names: the names of the commands to be represented by a constructor each, together
+          with `Options.COMMAND_SAMPLE_SIZE` other commands, sampled at random. The remaining commands
+          are represented by one `OTHER` constructor. All commands are represented if `None`.
+        """
+        dictionary = self.command_dictionary
+        key = None if cmd_names is None else (frozenset(cmd_names), Options.COMMAND_SAMPLE_SIZE)
+        if key not in self.datatypes:
+            if cmd_names is None:
+                smt_commands = dictionary.commands
+            else:
+                unreferenced = [cmd.name for cmd in dictionary.commands if cmd.name not in cmd_names]
+                sample_size = min(Options.COMMAND_SAMPLE_SIZE, len(unreferenced))
+                sample = set(random.Random(0).sample(unreferenced, sample_size))
+                smt_commands = [cmd for cmd in dictionary.commands if cmd.name in cmd_names or cmd.name in sample]
+            smt_names = {cmd.name for cmd in smt_commands}
+            other_commands = [cmd for cmd in dictionary.commands if cmd.name not in smt_names]
+            count = next(datatype_count)
+            Command = dictionary.to_smt_type(smt_commands, 'Command' if count == 0 else f'Command_{count}')
+            timeline = Function('timeline', IntSort(), Command)
+            CommandName = Datatype(f'{Command.name()}Name')
+            for i in range(Command.num_constructors()):
+                CommandName.declare(Command.constructor(i).name())
+            CommandName = CommandName.create()
+            skeleton = Function('skeleton', IntSort(), CommandName)
+            flat_timeline = FlatTimeline(Command)
+            self.datatypes[key] = (Command, timeline, CommandName, skeleton, flat_timeline, smt_commands, other_commands)
+        self._use(self.datatypes[key])
+
+    @contextmanager
+    def commands_selected(self, cmd_names: Optional[set[str]]) -> Iterator['Session']:
+        """Selects commands as `select_commands` does for the duration of a `with` statement,
+        after which the `Command` datatype selected before is selected again.
+
+        :param cmd_names: the names of the commands to select, see `select_commands`.
+        :return: the session.
+        """
+        previous = self.selected
+        self.select_commands(cmd_names)
+        try:
+            yield self
+        finally:
+            self._use(previous)
+
+    def _use(self, datatypes: tuple):
+        """Makes a `Command` datatype, with the datatypes built from it, the selected one."""
+        self.selected = datatypes
+        (self.Command, self.timeline, self.CommandName, self.skeleton, self.flat_timeline,
+         self.command_dictionary.smt_commands, self.command_dictionary.other_commands) = datatypes
+
+    def activate(self) -> 'Session':
+        """Makes this session the current session.
+
+        :return: the session.
+        """
+        global current_session
+        current_session = self
+        return self
+
+
+def get_session() -> Session:
+    """Returns the current session, which is created from the configuration file
+    if no session has been activated.
+
+    :return: the current session.
+    """
+    if current_session is None:
+        Session().activate()
+    return current_session
+
+
+def initialize(config_path: Optional[str] = None) -> Session:
+    """Creates a session from a configuration file, and makes it the current session.
+
+    Worker processes used for generating tests in parallel are started with the `spawn`
+    method, and each worker therefore initializes its own session from the same
+    configuration file.
+
+    :param config_path: the path to the configuration file, see `Session`.
+    :return: the session.
+    """
+    return Session(config_path).activate()
+
+
+class SessionAttribute:
+    """Refers to an attribute of the current session, such that for example
+    `timeline(t)` is short for `get_session().timeline(t)`.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attribute: str):
+        return getattr(getattr(get_session(), self.name), attribute)
+
+    def __call__(self, *args, **kwargs):
+        return getattr(get_session(), self.name)(*args, **kwargs)
+
+
+# ==================================================================
+# The current session.
+# ==================================================================
+
+current_session: Optional[Session] = None
+
+# The number of `Command` datatypes created, used for naming them apart.
+datatype_count = itertools.count()
+
+# The number of command dictionaries created, used for naming their enumeration datatypes apart.
+dictionary_count = itertools.count()
 
+command_dictionary: FSWCommandDictionary = SessionAttribute('command_dictionary')
+Command: Datatype = SessionAttribute('Command')
+timeline: FuncDeclRef = SessionAttribute('timeline')
+CommandName: Datatype = SessionAttribute('CommandName')
+skeleton: FuncDeclRef = SessionAttribute('skeleton')
+flat_timeline: FlatTimeline = SessionAttribute('flat_timeline')
@@ -22,8 +22,14 @@ from argparse import RawTextHelpFormatter
 import json
 import os
 import sys
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-from typing import List,Tuple
+from typing import List,Tuple,Optional
+
+from fuzz.options import Options
 
 ################################################################################
 #  CONSTANTS & GLOBALS
@@ -32,68 +38,159 @@ from typing import List,Tuple
 debug0 = False
 debug = False
 
+# The format of the cache entries. It must be increased whenever the extracted dictionaries
+# or the layout of the entries change, such that entries of an older format are not used.
+CACHE_VERSION = 1
+
 # This flag is for commands that contain repeat arguments which we aren't
 # handling yet
 skipThisCommand = False
 
-enumEntireList = []
-cmdEntireList = []
-
 ################################################################################
 #  FUNCTIONS
 ################################################################################
         
 def gen_cmd_file(cmdfile):
-    global enumEntireList
-    global cmdEntireList
+    """
+    Extracts the enumeration types and commands defined in one XML file.
 
-    # Get command xml file
-    foundFile = False
+    The file is parsed incrementally: each enumeration table and command definition
+    is processed when its end tag is read, and is then removed from the tree, such
+    that only one definition is held in memory at a time.
 
+    :param cmdfile: the XML file.
+    :return: the lists of enumeration type and command dictionaries, or `None`
+             if the file does not exist.
+    """
+    enumArray = []
+    cmdArray = []
+
+    # Get command xml file
     if not os.path.isfile(cmdfile):
         print('WARNING: Command XML file not found for: {}'.format(cmdfile))
-        return -1
-        
-    
-    # Parse xml into tree structure
-    tree = ET.parse(cmdfile)
+        return None
 
-    root = tree.getroot()
-    enumArray = []
-        
-    # Write Enum Structs
-    enumStructs = root.find('enum_definitions')
-    if enumStructs:
-            
-        for enumroot in enumStructs.findall('enum_table'):
+    # Parse xml incrementally, keeping the path from the root to the current element
+    path = []
+    for event, node in ET.iterparse(cmdfile, events=('start', 'end')):
+        if event == 'start':
+            path.append(node)
+            continue
+        path.pop()
+        if len(path) == 2 and path[1].tag == 'enum_definitions' and node.tag == 'enum_table':
             if debug0:
-                print("in enumroot, %s"%enumroot.attrib['name'])
-            
+                print("in enumroot, %s"%node.attrib['name'])
+
             # Generate python class definition
-            retEnumDict = write_enum_dicts(enumroot)
-            enumEntireList.append(retEnumDict)
+            retEnumDict = write_enum_dicts(node)
             enumArray.append(retEnumDict)
+        elif len(path) == 2 and path[1].tag == 'command_definitions':
 
+            # Generate python class definition
+            retCmdDict = write_cmd_class(node)
+            if retCmdDict:
+                cmdArray.append(retCmdDict)
+            else:
+                print("INFO: command {} not included in fuzz command dictionary ".format(node.attrib['stem']))
+        elif len(path) != 1:
+            continue
 
-    cmds = root.find('command_definitions')
-
-    cmdArray = []
-    retCmdDict = {}
-    for cmdroot in cmds:
-
-        # Generate python class definition
-        retCmdDict = write_cmd_class(cmdroot)
-        if retCmdDict:
-            cmdEntireList.append(retCmdDict)
-        else:
-            print("INFO: command {} not included in fuzz command dictionary ".format(cmdroot.attrib['stem']))
+        # Free the processed definition, or section of the root
+        path[-1].remove(node)
 
     if debug:
         print("\n\n\n GLOBAL cmdarray")
-        for i in cmdEntireList:
+        for i in cmdArray:
             print(i)
 
     print('PROCESSED: {}'.format(cmdfile))
+    return enumArray, cmdArray
+
+def cache_path(cmdfile):
+    """
+    Returns the path of the cache file for an XML file, determined by its absolute path and `CACHE_VERSION`.
+
+    :param cmdfile: the XML file.
+    :return: the path of the cache file.
+    """
+    key = hashlib.sha256('{}:{}'.format(CACHE_VERSION, os.path.abspath(cmdfile)).encode('utf-8')).hexdigest()
+    return os.path.join(Options.COMMAND_CACHE_DIR, key + '.json')
+
+def file_hash(cmdfile):
+    """
+    Returns the sha256 hash of the contents of a file.
+
+    :param cmdfile: the file.
+    :return: the hash as a hexadecimal string.
+    """
+    digest = hashlib.sha256()
+    with open(cmdfile, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_cache(cmdfile):
+    """
+    Looks up the enumeration types and commands extracted from an XML file in the cache
+    in the directory `Options.COMMAND_CACHE_DIR`, unless `None`. A cached result is used
+    if it has the current `CACHE_VERSION` and was extracted from a file with the same path, size
+    and sha256 hash of the contents.
+
+    :param cmdfile: the XML file.
+    :return: the lists of enumeration type and command dictionaries, or `None`
+             if the file is not cached.
+    """
+    if Options.COMMAND_CACHE_DIR is None or not os.path.isfile(cmdfile):
+        return None
+    try:
+        with open(cache_path(cmdfile), 'r') as file:
+            entry = json.load(file)
+        if entry['version'] == CACHE_VERSION and entry['path'] == os.path.abspath(cmdfile) and entry['size'] == os.path.getsize(cmdfile) \
+                and entry['sha256'] == file_hash(cmdfile):
+            print('PROCESSED: {} (cached)'.format(cmdfile))
+            return entry['enums'], entry['cmds']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def write_cache(cmdfile, result):
+    """
+    Stores the enumeration types and commands extracted from an XML file in the cache
+    in the directory `Options.COMMAND_CACHE_DIR`, unless `None`, replacing any previous result.
+
+    :param cmdfile: the XML file.
+    :param result: the lists of enumeration type and command dictionaries.
+    """
+    if Options.COMMAND_CACHE_DIR is None:
+        return
+    entry = {
+        'version': CACHE_VERSION,
+        'path': os.path.abspath(cmdfile),
+        'size': os.path.getsize(cmdfile),
+        'sha256': file_hash(cmdfile),
+        'enums': result[0],
+        'cmds': result[1]
+    }
+    path = cache_path(cmdfile)
+    try:
+        os.makedirs(Options.COMMAND_CACHE_DIR, exist_ok=True)
+        temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary_path, 'w') as file:
+            json.dump(entry, file, separators=(',', ':'))
+        os.replace(temporary_path, path)
+    except OSError as e:
+        print('WARNING: could not cache {}: {}'.format(cmdfile, e))
+
+def parse_cmd_file(cmdfile):
+    """
+    Extracts the enumeration types and commands defined in one XML file, and measures the time it takes.
+
+    :param cmdfile: the XML file.
+    :return: the result of `gen_cmd_file` and the time in seconds.
+    """
+    start_time = time.time()
+    result = gen_cmd_file(cmdfile)
+    return result, time.time() - start_time
 
 def write_cmd_class(cmdroot):
     global skipThisCommand
@@ -255,8 +352,6 @@ def generate_commands(cmd_files: List[str]) -> Tuple[dict, dict]:
     :param cmd_files: the fsw areas to generate commands from.
     :return: the dictionaries representing resp. enumeration types and commands.
     """
-    global enumEntireList
-    global cmdEntireList
 
     # This function  generates python enum and command dictionaries that 
     # contain commands for a specified command xml file
@@ -270,8 +365,30 @@ def generate_commands(cmd_files: List[str]) -> Tuple[dict, dict]:
     # ERROR: error message
     # -- when the tool was not able to run successfully
 
-    for i in cmd_files:
-        gen_cmd_file(i)
+    # Files which are not cached are parsed, in parallel if there are several and `Options.PARSE_WORKERS` allows it
+    results = [read_cache(i) for i in cmd_files]
+    uncached = [i for i, result in zip(cmd_files, results) if result is None]
+    workers = min(len(uncached), Options.PARSE_WORKERS or os.cpu_count() or 1)
+    if workers > 1:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            parsed = iter(list(executor.map(parse_cmd_file, uncached)))
+    else:
+        parsed = iter([parse_cmd_file(i) for i in uncached])
+    for n, i in enumerate(cmd_files):
+        if results[n] is None:
+            results[n], seconds = next(parsed)
+            print('INFO: parsed {} in {:.3f} seconds'.format(i, seconds))
+            if results[n] is not None:
+                write_cache(i, results[n])
+
+    # Later files override definitions with the same name in earlier files
+    enumEntireList = []
+    cmdEntireList = []
+    for result in results:
+        if result is not None:
+            enumEntireList.extend(result[0])
+            cmdEntireList.extend(result[1])
 
     d1 = {}
     for i in enumEntireList:
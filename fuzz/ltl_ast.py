@@ -5,15 +5,18 @@ This includes also type checking (wellformedness check).
 """
 
 from __future__ import annotations
-from typing import Dict, Any
-from dataclasses import dataclass, is_dataclass, fields
+from typing import Dict, Any, Callable, Optional
+import typing
+from dataclasses import dataclass, is_dataclass, fields, field, replace
 from collections import Counter
 import re
 
-from fuzz.utils import CommandDict, Test, TestSuite
+from fuzz.utils import CommandDict, Test, TestSuite, debug
+from fuzz.options import Options, TemporalEncoding, EvaluationStrategy
 from fuzz.commands import *
 
 Environment = Dict[str, Any]  # Environment maps strings to Z3 expressions (or ints)
+Time = typing.Union[int, ArithRef]  # A time point, or a time variable bound by a quantifier, see `quantify`
 
 TAB = '  '
 
@@ -183,6 +186,24 @@ def within(index: int, test: Test) -> bool:
     return 0 <= index < len(test)
 
 
+def field_value(command_name: str, field_name: str, t: Time) -> ExprRef:
+    """Returns the value of a field of the command at a time point, see `smt_argument`.
+    Fields of `any` command are represented by a variable per time point, see `SMTContext.any_field`.
+
+    :param command_name: the name of the command, or "any".
+    :param field_name: the name of the field.
+    :param t: the time point.
+    :return: A Z3 expression representing the value of the field.
+    :raises ValueError: if the field is not a field of the command.
+    """
+    if command_name == "any":
+        return smt_context.any_field(field_name, t)
+    try:
+        return smt_argument(command_name, field_name, t)
+    except AttributeError:
+        raise ValueError(f"Field '{field_name}' does not exist in constructor '{command_name}'.")
+
+
 def extract_field(command_name, field_name, command):
     """
     Extracts the value of a specified field from a Z3 Datatype instance,
@@ -235,6 +256,304 @@ def extract_field(command_name, field_name, command):
             raise ValueError(f"Field '{field_name}' does not exist in constructor '{command_name}'.")
 
 
+# ==================================================================
+# State shared by the translations of formulas to Z3
+# ==================================================================
+
+def env_key(env: Environment) -> tuple:
+    """Returns a hashable key identifying the values of the variables in an environment.
+
+    :param env: the environment.
+    :return: the key, mapping each variable to the id of its Z3 term (or its value).
+    """
+    return tuple(sorted((name, value.get_id() if isinstance(value, AstRef) else value) for name, value in env.items()))
+
+
+class SMTContext:
+    """State shared by the `to_smt` methods while a specification is translated to Z3.
+
+    Attributes:
+        definitions: constraints defining the auxiliary variables introduced by the translation.
+        auxiliaries: maps a formula and the environment it is translated in, to the auxiliary
+          variables representing its value at each time point. The formula and environment are
+          stored as well, keeping the objects whose ids make up the key alive, together with the
+          index of the entry, which is part of the names of the variables.
+        translations: maps a formula, time point, end time and environment to the Z3 term
+          the formula was translated to. Like for `auxiliaries`, the formula, environment and
+          time point are stored.
+        hits: number of translations found in `translations`.
+        misses: number of translations not found in `translations`.
+        times: number of time variables bound by quantifiers, see `quantify`.
+        fields: maps a field common to all commands and a time point to the variable
+          representing the value of the field at the time point, see `any_field`.
+        skeleton: if true, the specification is translated to a constraint on the `skeleton` of
+          command names, abstracting from arguments: each formula depending on arguments at a time
+          point is represented by a fresh Boolean variable. The constraint is thus implied by the
+          constraint on the `timeline`.
+    """
+
+    def __init__(self, skeleton: bool = False):
+        self.skeleton: bool = skeleton
+        self.definitions: list[BoolRef] = []
+        self.auxiliaries: dict[tuple, tuple[LTLFormula, Environment, int, dict[int, BoolRef]]] = {}
+        self.translations: dict[tuple, tuple[LTLFormula, Environment, Time, BoolRef]] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.times: int = 0
+        self.fields: dict[tuple[str, int], ExprRef] = {}
+
+    def translate(self, formula: LTLFormula, env: Environment, t: int, end_time: int) -> BoolRef:
+        """Returns the Z3 representation of a formula, reusing the term built the last time the
+        formula was translated at the same time point with the same variable bindings.
+
+        :param formula: the formula.
+        :param env: the environment defining variables in scope.
+        :param t: the current time, an integer or a Z3 term, see `quantify`.
+        :param end_time: the end time of the timeline.
+        :return: the Z3 representation of the formula.
+        """
+        key = (id(formula), t.get_id() if isinstance(t, AstRef) else t, end_time, env_key(env))
+        if key in self.translations:
+            self.hits += 1
+            return self.translations[key][3]
+        self.misses += 1
+        result = formula.to_smt(env, t, end_time)
+        self.translations[key] = (formula, env, t, result)
+        return result
+
+    def report(self):
+        """Reports the number of translations reused."""
+        total = self.hits + self.misses
+        if total > 0:
+            debug(2, f'SMT translation cache: {self.hits} hits, {self.misses} misses '
+                     f'({100 * self.hits / total:.1f}% hit rate)')
+
+    def get_auxiliaries(self, formula: LTLFormula, env: Environment) -> dict[int, BoolRef]:
+        """Returns the auxiliary variables, indexed by time, defined so far for a formula.
+
+        :param formula: the formula.
+        :param env: the environment the formula is translated in.
+        :return: the mapping from time points to auxiliary variables.
+        """
+        key = (id(formula), env_key(env))
+        if key not in self.auxiliaries:
+            self.auxiliaries[key] = (formula, env, len(self.auxiliaries), {})
+        return self.auxiliaries[key][3]
+
+    def new_abstraction(self, formula: LTLFormula, t: Time) -> BoolRef:
+        """Creates a fresh variable representing the value of a formula depending on arguments,
+        when translating to a constraint on the `skeleton`. At a time point bound by a quantifier,
+        the value is a fresh predicate applied to the time point.
+
+        :param formula: the formula whose value the variable represents.
+        :param t: the time point the variable represents the value at.
+        :return: the variable.
+        """
+        if isinstance(t, AstRef):
+            return FreshFunction(IntSort(), BoolSort())(t)
+        return FreshBool(f'{type(formula).__name__}_{t}')
+
+    def any_field(self, field_name: str, t: Time) -> ExprRef:
+        """Returns the value of a field common to all commands, at a time point. The value is
+        represented by one variable per field and time point, linked once to the selectors of the
+        field in each constructor of `Command`, such that `any` formulas refer to the variable
+        rather than to an If-Then-Else chain over all constructors. At a time point bound by a
+        quantifier, the chain is returned. With a flat timeline, the argument variable of the
+        time point is returned, see `FlatTimeline`.
+
+        :param field_name: the name of the field.
+        :param t: the time point.
+        :return: the value of the field.
+        """
+        if use_flat_timeline():
+            return flat_timeline.any_argument(field_name, t)
+        if isinstance(t, AstRef):
+            return extract_field('any', field_name, timeline(t))
+        key = (field_name, t)
+        if key not in self.fields:
+            command = timeline(t)
+            links: list[BoolRef] = []
+            variable = None
+            for i in range(Command.num_constructors()):
+                constructor_name = Command.constructor(i).name()
+                field_selector = getattr(Command, f'{constructor_name}_{field_name}', None)
+                if field_selector is not None:
+                    if variable is None:
+                        variable = Const(f'any_{field_name}_{t}', field_selector.range())
+                    links.append(Implies(getattr(Command, f'is_{constructor_name}')(command),
+                                         field_selector(command) == variable))
+            if variable is None:
+                raise ValueError(f"Field '{field_name}' does not exist in any constructor.")
+            self.definitions += links
+            self.fields[key] = variable
+        return self.fields[key]
+
+    def new_time(self) -> ArithRef:
+        """Creates a time variable to be bound by a quantifier.
+
+        :return: the time variable.
+        """
+        self.times += 1
+        return Int(f'time_{self.times}')
+
+    def new_auxiliary(self, formula: LTLFormula, env: Environment, t: int, definition: BoolRef) -> BoolRef:
+        """Creates an auxiliary variable and records its definition. The variable is named after
+        the entry of the formula and environment in `auxiliaries`, which must exist.
+
+        :param formula: the formula whose value the variable represents.
+        :param env: the environment the formula is translated in.
+        :param t: the time point the variable represents the value at.
+        :param definition: the value of the variable.
+        :return: the auxiliary variable.
+        """
+        index = self.auxiliaries[(id(formula), env_key(env))][2]
+        variable = Bool(f'{type(formula).__name__}_{index}_{t}')
+        self.definitions.append(variable == definition)
+        return variable
+
+    def future_recurrence(self, formula: LTLFormula, env: Environment, t: int, end_time: int, boundary: bool,
+                          step: Callable[[int, BoolRef], BoolRef]) -> BoolRef:
+        """Returns the value of a future time formula at time `t`, defined by a one-step recurrence:
+
+            X_k = step(k, X_{k+1}) for k < end_time, and X_end_time = boundary.
+
+        The auxiliary variables X_k are shared between all translations of the formula in the same
+        environment, making the size of the translation linear in `end_time`.
+
+        :param formula: the formula.
+        :param env: the environment defining variables in scope.
+        :param t: the current time.
+        :param end_time: the end time of the timeline.
+        :param boundary: the value of the formula after the end of the timeline.
+        :param step: computes the value at time k from the value at time k+1.
+        :return: the Z3 representation of the formula at time `t`.
+        """
+        if t >= end_time:
+            return BoolVal(boundary)
+        variables = self.get_auxiliaries(formula, env)
+        if t not in variables:
+            first = min(variables, default=end_time)
+            for k in range(first - 1, t - 1, -1):
+                later = variables[k + 1] if k + 1 < end_time else BoolVal(boundary)
+                variables[k] = self.new_auxiliary(formula, env, k, step(k, later))
+        return variables[t]
+
+    def past_recurrence(self, formula: LTLFormula, env: Environment, t: int, end_time: int, boundary: bool,
+                        step: Callable[[int, BoolRef], BoolRef]) -> BoolRef:
+        """Returns the value of a past time formula at time `t`, defined by a one-step recurrence:
+
+            X_k = step(k, X_{k-1}) for k >= 0, and X_-1 = boundary.
+
+        :param formula: the formula.
+        :param env: the environment defining variables in scope.
+        :param t: the current time.
+        :param end_time: the end time of the timeline.
+        :param boundary: the value of the formula before the start of the timeline.
+        :param step: computes the value at time k from the value at time k-1.
+        :return: the Z3 representation of the formula at time `t`.
+        """
+        if t < 0:
+            return BoolVal(boundary)
+        variables = self.get_auxiliaries(formula, env)
+        if t not in variables:
+            last = max(variables, default=-1)
+            for k in range(last + 1, t + 1):
+                earlier = variables[k - 1] if k > 0 else BoolVal(boundary)
+                variables[k] = self.new_auxiliary(formula, env, k, step(k, earlier))
+        return variables[t]
+
+
+smt_context = SMTContext()
+
+
+def use_recurrence() -> bool:
+    """Returns True iff. temporal operators are translated using one-step recurrences."""
+    return Options.TEMPORAL_ENCODING == TemporalEncoding.RECURRENCE
+
+
+def use_quantifiers() -> bool:
+    """Returns True iff. temporal operators are translated using quantifiers over time."""
+    return Options.TEMPORAL_ENCODING == TemporalEncoding.QUANTIFIED
+
+
+def quantify(exists: bool, lower: Time, upper: Time, body: Callable[[ArithRef], BoolRef]) -> BoolRef:
+    """Returns a quantification over the time points k with `lower <= k < upper`:
+
+        exists k . lower <= k < upper and body(k), or
+        forall k . lower <= k < upper => body(k).
+
+    The size of the result is independent of the bounds, which can themselves be
+    time variables bound by enclosing quantifiers.
+
+    :param exists: True for an existential quantifier, False for a universal quantifier.
+    :param lower: the first time point.
+    :param upper: the time point after the last time point.
+    :param body: computes the quantified formula from the time variable.
+    :return: the Z3 quantifier.
+    """
+    k = smt_context.new_time()
+    bounds = And(lower <= k, k < upper)
+    if exists:
+        return Exists([k], And(bounds, body(k)))
+    return ForAll([k], Implies(bounds, body(k)))
+
+
+def shift(t: Time, offset: int, end_time: int, subformula: Callable[[Time], BoolRef], boundary: bool) -> BoolRef:
+    """Returns the value of a formula at time `t + offset`, or `boundary` if that is outside the timeline.
+
+    :param t: the current time, an integer or a time variable bound by a quantifier.
+    :param offset: the offset to the current time.
+    :param end_time: the end time of the timeline.
+    :param subformula: computes the formula at a time point within the timeline.
+    :param boundary: the value outside the timeline.
+    :return: the Z3 representation of the shifted formula.
+    """
+    if isinstance(t, AstRef):
+        return If(And(0 <= t + offset, t + offset < end_time), subformula(t + offset), BoolVal(boundary))
+    if 0 <= t + offset < end_time:
+        return subformula(t + offset)
+    return BoolVal(boundary)
+
+
+def count_literals(subformula: Callable[[int], BoolRef], lower: Time, upper: Time, end_time: int) -> list[BoolRef]:
+    """Returns the values of a formula at the time points k with `lower <= k < upper`, to be counted.
+    If a bound is a time variable bound by a quantifier, each time point of the timeline is
+    guarded by the bounds instead.
+
+    :param subformula: computes the formula at a time point.
+    :param lower: the first time point.
+    :param upper: the time point after the last time point.
+    :param end_time: the end time of the timeline.
+    :return: the literals.
+    """
+    if isinstance(lower, AstRef) or isinstance(upper, AstRef):
+        return [And(lower <= k, k < upper, subformula(k)) for k in range(end_time)]
+    return [subformula(k) for k in range(lower, upper)]
+
+
+def count_constraint(literals: list[BoolRef], min: int, max: int) -> BoolRef:
+    """Returns a pseudo-Boolean constraint stating that between `min` and `max`
+    of the literals are true.
+
+    :param literals: the literals to count.
+    :param min: the minimal number of true literals.
+    :param max: the maximal number of true literals.
+    :return: the Z3 constraint.
+    """
+    if min > len(literals) or min > max:
+        return BoolVal(False)
+    if not literals:
+        return BoolVal(True)
+    if min == max:
+        return PbEq([(literal, 1) for literal in literals], min)
+    constraints: list[BoolRef] = []
+    if min > 0:
+        constraints.append(AtLeast(*literals, min))
+    if max < len(literals):
+        constraints.append(AtMost(*literals, max))
+    return And(constraints)
+
+
 # ==================================================================
 # Abstract Syntax
 # ==================================================================
@@ -622,7 +941,7 @@ class LTLVariableConstraint(LTLConstraint):
         return f'{self.field} = {self.variable}'
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        actual_value = extract_field(self.command_name, self.field, timeline(t))
+        actual_value = field_value(self.command_name, self.field, t)
         return actual_value == env[self.variable]
 
     def evaluate(self, env: Environment, cmd: CommandDict) -> bool:
@@ -685,7 +1004,7 @@ class LTLNumberConstraint(LTLConstraint):
         return f'{self.field} = {self.value}'
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        actual_value = extract_field(self.command_name, self.field, timeline(t))
+        actual_value = field_value(self.command_name, self.field, t)
         return actual_value == self.value
 
     def evaluate(self, env: Environment, cmd: CommandDict) -> bool:
@@ -715,7 +1034,7 @@ class LTLFloatConstraint(LTLConstraint):
         return f'{self.field} = {self.value}'
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        actual_value = extract_field(self.command_name, self.field, timeline(t))
+        actual_value = field_value(self.command_name, self.field, t)
         return actual_value == self.value
 
     def evaluate(self, env: Environment, cmd: CommandDict) -> bool:
@@ -745,7 +1064,7 @@ class LTLStringConstraint(LTLConstraint):
         return f'{self.field} = "{self.value}"'
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        actual_value = extract_field(self.command_name, self.field, timeline(t))
+        actual_value = field_value(self.command_name, self.field, t)
         return actual_value == self.value
 
     def evaluate(self, env: Environment, cmd: CommandDict) -> bool:
@@ -776,7 +1095,7 @@ class LTLEnumConstraint(LTLConstraint):
         return f'{self.field} = {self.type_id}.{self.value_id}'
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        actual_value = extract_field(self.command_name, self.field, timeline(t))
+        actual_value = field_value(self.command_name, self.field, t)
         enum_type = command_dictionary.get_enum_datatype(self.type_id)
         required_value = getattr(enum_type, self.value_id)
         return actual_value == required_value
@@ -827,16 +1146,69 @@ class LTLFormula(ASTNode,ABC):
         """
         return set([])
 
+    def get_command_names(self) -> set[str]:
+        """Returns the names of all commands mentioned in command match formulas,
+        except `any`.
+
+        :return: the command names.
+        """
+        names = set()
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, LTLFormula):
+                names |= value.get_command_names()
+        return names
+
+    def temporal(self) -> bool:
+        """Returns True iff. the formula contains temporal operators, such that its value
+        at a time point can depend on the commands at other time points.
+
+        :return: True iff. the formula contains temporal operators.
+        """
+        if isinstance(self, TEMPORAL_FORMULAS):
+            return True
+        return any(isinstance(getattr(self, f.name), LTLFormula) and getattr(self, f.name).temporal()
+                   for f in fields(self))
+
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
         """Returns a Z3 representation of the formula.
 
         :param env: the environment defining variables in scope.
-        :param t: the current time.
+        :param t: the current time. With `TemporalEncoding.QUANTIFIED`, it can be a time variable
+          bound by a quantifier, see `quantify`.
         :param end_time: the end time of the timeline.
         :return: the Z3 representation of the formula.
         """
         raise NotImplementedError("Subclasses should implement this!")
 
+    def desugar(self) -> LTLFormula:
+        """Returns the formula with all derived formulas expanded, recursively,
+        such that it only contains formulas from the core set of formulas.
+        Formulas without derived subformulas are returned unchanged.
+
+        :return: the desugared formula.
+        """
+        changes = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, LTLFormula):
+                desugared = value.desugar()
+                if desugared is not value:
+                    changes[f.name] = desugared
+        return replace(self, **changes) if changes else self
+
+    def smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
+        """Returns a Z3 representation of the formula, as `to_smt`, but memoized:
+        translating the same formula node at the same time with the same bindings
+        returns the same Z3 term. Subformulas should be translated with this method.
+
+        :param env: the environment defining variables in scope.
+        :param t: the current time.
+        :param end_time: the end time of the timeline.
+        :return: the Z3 representation of the formula.
+        """
+        return smt_context.translate(self, env, t, end_time)
+
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         """Evaluates the formula.
 
@@ -847,6 +1219,29 @@ class LTLFormula(ASTNode,ABC):
         """
         raise NotImplementedError("Subclasses should implement this!")
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        """Evaluates the formula at all positions of a test at once, in one sweep
+        over the test, as an alternative to calling `evaluate` at each position.
+
+        :param env: the environment defining variables in scope.
+        :param test: the test to evaluate the formula on.
+        :return: the list v of length len(test) + 1, where v[i] = evaluate(env, test, i).
+          The last entry is the value after the end of the test.
+        """
+        raise NotImplementedError("Subclasses should implement this!")
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        """Updates the truth vector of the formula kept by an incremental evaluator,
+        after the command at position `index` in the test has changed. By default the
+        vector is recomputed from scratch. Subclasses only recompute the positions that
+        can depend on `index`.
+
+        :param evaluator: the evaluator keeping the truth vectors.
+        :param index: the position changed, or None if the vector has not been computed yet.
+        :return: the positions where the value of the formula changed.
+        """
+        return evaluator.assign(self, evaluator.all_positions(), self.truth_vector({}, evaluator.test).__getitem__)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         """Checks if the formula is wellformed. Reports if not.
 
@@ -869,6 +1264,9 @@ class LTLTrue(LTLFormula):
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return True
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        return [True] * (len(test) + 1)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return True
 
@@ -890,6 +1288,9 @@ class LTLFalse(LTLFormula):
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return False
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        return [False] * (len(test) + 1)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return True
 
@@ -910,6 +1311,8 @@ class LTLRelation(LTLFormula):
         return result
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
+        if smt_context.skeleton:
+            return smt_context.new_abstraction(self, t)
         value1 = self.exp1.to_smt(env)
         value2 = self.exp2.to_smt(env)
 
@@ -946,6 +1349,9 @@ class LTLRelation(LTLFormula):
         else:
             raise ValueError(f"Invalid relational operator: {self.oper}")
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        return [self.evaluate(env, test, 0)] * (len(test) + 1)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok_exp1 = self.exp1.wellformed(symbols)
         ok_exp2 = self.exp2.wellformed(symbols)
@@ -985,6 +1391,8 @@ class LTLInRegExp(LTLFormula):
         return result
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
+        if smt_context.skeleton:
+            return smt_context.new_abstraction(self, t)
         value = self.exp.to_smt(env)
         return z3.InRe(value, self.regexp_constraint)
 
@@ -992,6 +1400,9 @@ class LTLInRegExp(LTLFormula):
         value = self.exp.evaluate(env)
         return re.fullmatch(self.regexp_string, value) is not None
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        return [self.evaluate(env, test, 0)] * (len(test) + 1)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.exp.get_type(symbols) == BaseType.STRING
 
@@ -1019,6 +1430,10 @@ class LTLCommandMatch(LTLFormula):
         formula_args = self.subformula.get_any_args()
         return constraint_args | formula_args
 
+    def get_command_names(self) -> set[str]:
+        names = self.subformula.get_command_names()
+        return names if self.command_name == 'any' else names | {self.command_name}
+
     def required(self) -> bool:
         return str(self.arrow) in ["&>", "andthen"]
 
@@ -1026,18 +1441,27 @@ class LTLCommandMatch(LTLFormula):
         if self.command_name == 'any':
             right_command: BoolRef = True
         else:
-            is_method: str = f'is_{self.command_name}'
             try:
-                right_command: BoolRef = getattr(Command, is_method)(timeline(t))
+                if smt_context.skeleton:
+                    right_command: BoolRef = getattr(CommandName, f'is_{self.command_name}')(skeleton(t))
+                else:
+                    right_command: BoolRef = smt_is_command(self.command_name, t)
             except AttributeError:
                 raise ValueError(f"Invalid command name: {self.command_name}")
-        right_arguments: list[BoolRef] = [constraint.to_smt(env, t, end_time) for constraint in self.constraints]
-        event_constraint = And([right_command] + right_arguments)
         env_plus = env.copy()
         bindings = [c for c in self.constraints if isinstance(c, LTLVariableBinding)]
-        for binding in bindings:
-            env_plus[binding.variable] = extract_field(binding.command_name, binding.field, timeline(t))
-        subformula_constraint = self.subformula.to_smt(env_plus, t, end_time)
+        if smt_context.skeleton:
+            # A variable is represented by the time it is bound at, which determines its value
+            right_arguments: list[BoolRef] = [smt_context.new_abstraction(self, t)] \
+                if len(bindings) < len(self.constraints) else []
+            for binding in bindings:
+                env_plus[binding.variable] = t
+        else:
+            right_arguments: list[BoolRef] = [constraint.to_smt(env, t, end_time) for constraint in self.constraints]
+            for binding in bindings:
+                env_plus[binding.variable] = field_value(binding.command_name, binding.field, t)
+        event_constraint = And([right_command] + right_arguments)
+        subformula_constraint = self.subformula.smt(env_plus, t, end_time)
         if self.required():
             final_constraint = And(event_constraint, subformula_constraint)
         else:
@@ -1059,6 +1483,47 @@ class LTLCommandMatch(LTLFormula):
                     return self.subformula.evaluate(env_plus, test, index)
         return not self.required()
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        bindings = [c for c in self.constraints if isinstance(c, LTLVariableBinding)]
+        subformula_vector = None if bindings else self.subformula.truth_vector(env, test)
+        binding_vectors: dict[tuple, list[bool]] = {}
+        vector = []
+        for index, cmd in enumerate(test):
+            value = not self.required()
+            if cmd['name'] == self.command_name or self.command_name == 'any':
+                if all([constraint.evaluate(env, cmd) for constraint in self.constraints]):
+                    if bindings:
+                        values = tuple(cmd[binding.field] for binding in bindings)
+                        if values not in binding_vectors:
+                            env_plus = env.copy()
+                            for binding, binding_value in zip(bindings, values):
+                                env_plus[binding.variable] = binding_value
+                            binding_vectors[values] = self.subformula.truth_vector(env_plus, test)
+                        value = binding_vectors[values][index]
+                    else:
+                        value = subformula_vector[index]
+            vector.append(value)
+        vector.append(not self.required())
+        return vector
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        if any(isinstance(c, LTLVariableBinding) for c in self.constraints):
+            return super().update_vector(evaluator, index)
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        test = evaluator.test
+
+        def value(position: int) -> bool:
+            if within(position, test):
+                cmd = test[position]
+                if cmd['name'] == self.command_name or self.command_name == 'any':
+                    if all([constraint.evaluate({}, cmd) for constraint in self.constraints]):
+                        return subformula_vector[position]
+            return not self.required()
+
+        positions = evaluator.all_positions() if index is None else changed | {index}
+        return evaluator.assign(self, positions, value)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         new_symbols = symbols.copy()
         ok_name = new_symbols.is_command(self.command_name)
@@ -1084,11 +1549,19 @@ class LTLNot(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return Not(self.subformula.to_smt(env, t, end_time))
+        return Not(self.subformula.smt(env, t, end_time))
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return not self.subformula.evaluate(env, test, index)
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        return [not value for value in self.subformula.truth_vector(env, test)]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        return evaluator.assign(self, changed, lambda position: not subformula_vector[position])
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1107,11 +1580,21 @@ class LTLAnd(LTLFormula):
         return self.left.get_any_args() | self.right.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return And(self.left.to_smt(env, t, end_time), self.right.to_smt(env, t, end_time))
+        return And(self.left.smt(env, t, end_time), self.right.smt(env, t, end_time))
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return self.left.evaluate(env, test, index) and self.right.evaluate(env, test, index)
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        left = self.left.truth_vector(env, test)
+        right = self.right.truth_vector(env, test)
+        return [l and r for l, r in zip(left, right)]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.left, index) | evaluator.update(self.right, index)
+        left, right = evaluator.vectors[id(self.left)], evaluator.vectors[id(self.right)]
+        return evaluator.assign(self, changed, lambda position: left[position] and right[position])
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok1 = self.left.wellformed(symbols)
         ok2 = self.right.wellformed(symbols)
@@ -1132,11 +1615,21 @@ class LTLOr(LTLFormula):
         return self.left.get_any_args() | self.right.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return Or(self.left.to_smt(env, t, end_time), self.right.to_smt(env, t, end_time))
+        return Or(self.left.smt(env, t, end_time), self.right.smt(env, t, end_time))
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return self.left.evaluate(env, test, index) or self.right.evaluate(env, test, index)
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        left = self.left.truth_vector(env, test)
+        right = self.right.truth_vector(env, test)
+        return [l or r for l, r in zip(left, right)]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.left, index) | evaluator.update(self.right, index)
+        left, right = evaluator.vectors[id(self.left)], evaluator.vectors[id(self.right)]
+        return evaluator.assign(self, changed, lambda position: left[position] or right[position])
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok1 = self.left.wellformed(symbols)
         ok2 = self.right.wellformed(symbols)
@@ -1157,11 +1650,21 @@ class LTLImplies(LTLFormula):
         return self.left.get_any_args() | self.right.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return Implies(self.left.to_smt(env, t, end_time), self.right.to_smt(env, t, end_time))
+        return Implies(self.left.smt(env, t, end_time), self.right.smt(env, t, end_time))
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return not self.left.evaluate(env, test, index) or self.right.evaluate(env, test, index)
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        left = self.left.truth_vector(env, test)
+        right = self.right.truth_vector(env, test)
+        return [not l or r for l, r in zip(left, right)]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.left, index) | evaluator.update(self.right, index)
+        left, right = evaluator.vectors[id(self.left)], evaluator.vectors[id(self.right)]
+        return evaluator.assign(self, changed, lambda position: not left[position] or right[position])
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok1 = self.left.wellformed(symbols)
         ok2 = self.right.wellformed(symbols)
@@ -1181,13 +1684,31 @@ class LTLEventually(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return Or([self.subformula.to_smt(env, t_prime, end_time) for t_prime in range(t, end_time)])
+        if use_recurrence():
+            return smt_context.future_recurrence(self, env, t, end_time, False,
+                lambda k, later: Or(self.subformula.smt(env, k, end_time), later))
+        if use_quantifiers():
+            return quantify(True, t, end_time, lambda k: self.subformula.smt(env, k, end_time))
+        return Or([self.subformula.smt(env, t_prime, end_time) for t_prime in range(t, end_time)])
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index, test):
             return self.subformula.evaluate(env, test, index) or self.evaluate(env, test, index + 1)
         return False
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        vector = self.subformula.truth_vector(env, test)
+        vector[-1] = False
+        for index in range(len(test) - 1, -1, -1):
+            vector[index] = vector[index] or vector[index + 1]
+        return vector
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        return evaluator.sweep_backward(self, changed, False,
+                                        lambda position, later: subformula_vector[position] or later)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1205,13 +1726,31 @@ class LTLAlways(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return And([self.subformula.to_smt(env, t_prime, end_time) for t_prime in range(t, end_time)])
+        if use_recurrence():
+            return smt_context.future_recurrence(self, env, t, end_time, True,
+                lambda k, later: And(self.subformula.smt(env, k, end_time), later))
+        if use_quantifiers():
+            return quantify(False, t, end_time, lambda k: self.subformula.smt(env, k, end_time))
+        return And([self.subformula.smt(env, t_prime, end_time) for t_prime in range(t, end_time)])
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index, test):
             return self.subformula.evaluate(env, test, index) and self.evaluate(env, test, index + 1)
         return True
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        vector = self.subformula.truth_vector(env, test)
+        vector[-1] = True
+        for index in range(len(test) - 1, -1, -1):
+            vector[index] = vector[index] and vector[index + 1]
+        return vector
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        return evaluator.sweep_backward(self, changed, True,
+                                        lambda position, later: subformula_vector[position] and later)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1228,15 +1767,26 @@ class LTLNext(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        if t + 1 < end_time:
-            return self.subformula.to_smt(env, t + 1, end_time)
-        return BoolVal(False)
+        return shift(t, 1, end_time, lambda k: self.subformula.smt(env, k, end_time), False)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index + 1, test):
             return self.subformula.evaluate(env, test, index + 1)
         return False
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        subformula_vector = self.subformula.truth_vector(env, test)
+        vector = subformula_vector[1:len(test)] + [False, False]
+        return vector[:len(test) + 1]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        test = evaluator.test
+        positions = evaluator.all_positions() if index is None else {position - 1 for position in changed if position > 0}
+        return evaluator.assign(self, positions,
+                                lambda position: subformula_vector[position + 1] if within(position + 1, test) else False)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1253,15 +1803,26 @@ class LTLWeakNext(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        if t + 1 < end_time:
-            return self.subformula.to_smt(env, t + 1, end_time)
-        return BoolVal(True)  # If no next step, it's trivially true.
+        return shift(t, 1, end_time, lambda k: self.subformula.smt(env, k, end_time), True)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index + 1, test):
             return self.subformula.evaluate(env, test, index + 1)
         return True
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        subformula_vector = self.subformula.truth_vector(env, test)
+        vector = subformula_vector[1:len(test)] + [True, True]
+        return vector[:len(test) + 1]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        test = evaluator.test
+        positions = evaluator.all_positions() if index is None else {position - 1 for position in changed if position > 0}
+        return evaluator.assign(self, positions,
+                                lambda position: subformula_vector[position + 1] if within(position + 1, test) else True)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1280,8 +1841,16 @@ class LTLUntil(LTLFormula):
         return self.left.get_any_args() | self.right.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return Or([And(self.right.to_smt(env, t_prime, end_time),
-                       And([self.left.to_smt(env, t_i, end_time) for t_i in range(t, t_prime)]))
+        if use_recurrence():
+            return smt_context.future_recurrence(self, env, t, end_time, False,
+                lambda k, later: Or(self.right.smt(env, k, end_time),
+                                    And(self.left.smt(env, k, end_time), later)))
+        if use_quantifiers():
+            return quantify(True, t, end_time, lambda k: And(
+                self.right.smt(env, k, end_time),
+                quantify(False, t, k, lambda j: self.left.smt(env, j, end_time))))
+        return Or([And(self.right.smt(env, t_prime, end_time),
+                       And([self.left.smt(env, t_i, end_time) for t_i in range(t, t_prime)]))
                    for t_prime in range(t, end_time)])
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
@@ -1291,6 +1860,20 @@ class LTLUntil(LTLFormula):
             )
         return False
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        left = self.left.truth_vector(env, test)
+        vector = self.right.truth_vector(env, test)
+        vector[-1] = False
+        for index in range(len(test) - 1, -1, -1):
+            vector[index] = vector[index] or (left[index] and vector[index + 1])
+        return vector
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.left, index) | evaluator.update(self.right, index)
+        left, right = evaluator.vectors[id(self.left)], evaluator.vectors[id(self.right)]
+        return evaluator.sweep_backward(self, changed, False,
+                                        lambda position, later: right[position] or (left[position] and later))
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok1 = self.left.wellformed(symbols)
         ok2 = self.right.wellformed(symbols)
@@ -1310,13 +1893,31 @@ class LTLOnce(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return Or([self.subformula.to_smt(env, t_prime, end_time) for t_prime in range(0, t + 1)])
+        if use_recurrence():
+            return smt_context.past_recurrence(self, env, t, end_time, False,
+                lambda k, earlier: Or(self.subformula.smt(env, k, end_time), earlier))
+        if use_quantifiers():
+            return quantify(True, 0, t + 1, lambda k: self.subformula.smt(env, k, end_time))
+        return Or([self.subformula.smt(env, t_prime, end_time) for t_prime in range(0, t + 1)])
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index, test):
             return self.subformula.evaluate(env, test, index) or self.evaluate(env, test, index - 1)
         return False
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        vector = self.subformula.truth_vector(env, test)
+        for index in range(1, len(test)):
+            vector[index] = vector[index] or vector[index - 1]
+        vector[-1] = False
+        return vector
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        return evaluator.sweep_forward(self, changed, False,
+                                       lambda position, earlier: subformula_vector[position] or earlier)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1334,13 +1935,31 @@ class LTLSofar(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return And([self.subformula.to_smt(env, t_prime, end_time) for t_prime in range(0, t + 1)])
+        if use_recurrence():
+            return smt_context.past_recurrence(self, env, t, end_time, True,
+                lambda k, earlier: And(self.subformula.smt(env, k, end_time), earlier))
+        if use_quantifiers():
+            return quantify(False, 0, t + 1, lambda k: self.subformula.smt(env, k, end_time))
+        return And([self.subformula.smt(env, t_prime, end_time) for t_prime in range(0, t + 1)])
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index, test):
             return self.subformula.evaluate(env, test, index) and self.evaluate(env, test, index - 1)
         return True
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        vector = self.subformula.truth_vector(env, test)
+        for index in range(1, len(test)):
+            vector[index] = vector[index] and vector[index - 1]
+        vector[-1] = True
+        return vector
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        return evaluator.sweep_forward(self, changed, True,
+                                       lambda position, earlier: subformula_vector[position] and earlier)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1358,15 +1977,26 @@ class LTLPrevious(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        if t - 1 >= 0:
-            return self.subformula.to_smt(env, t - 1, end_time)
-        return BoolVal(False)
+        return shift(t, -1, end_time, lambda k: self.subformula.smt(env, k, end_time), False)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index - 1, test):
             return self.subformula.evaluate(env, test, index - 1)
         return False
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        subformula_vector = self.subformula.truth_vector(env, test)
+        return [False] + subformula_vector[:len(test)]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        test = evaluator.test
+        positions = evaluator.all_positions() if index is None else \
+            {position + 1 for position in changed if position < len(test)}
+        return evaluator.assign(self, positions,
+                                lambda position: subformula_vector[position - 1] if within(position - 1, test) else False)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1384,15 +2014,26 @@ class LTLWeakPrevious(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        if t - 1 >= 0:
-            return self.subformula.to_smt(env, t - 1, end_time)
-        return BoolVal(True)
+        return shift(t, -1, end_time, lambda k: self.subformula.smt(env, k, end_time), True)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         if within(index - 1, test):
             return self.subformula.evaluate(env, test, index - 1)
         return True
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        subformula_vector = self.subformula.truth_vector(env, test)
+        return [True] + subformula_vector[:len(test)]
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        test = evaluator.test
+        positions = evaluator.all_positions() if index is None else \
+            {position + 1 for position in changed if position < len(test)}
+        return evaluator.assign(self, positions,
+                                lambda position: subformula_vector[position - 1] if within(position - 1, test) else True)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1411,8 +2052,16 @@ class LTLSince(LTLFormula):
         return self.left.get_any_args() | self.right.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return Or([And(self.right.to_smt(env, t_prime, end_time),
-                       And([self.left.to_smt(env, t_i, end_time) for t_i in range(t_prime + 1, t + 1)]))
+        if use_recurrence():
+            return smt_context.past_recurrence(self, env, t, end_time, False,
+                lambda k, earlier: Or(self.right.smt(env, k, end_time),
+                                      And(self.left.smt(env, k, end_time), earlier)))
+        if use_quantifiers():
+            return quantify(True, 0, t + 1, lambda k: And(
+                self.right.smt(env, k, end_time),
+                quantify(False, k + 1, t + 1, lambda j: self.left.smt(env, j, end_time))))
+        return Or([And(self.right.smt(env, t_prime, end_time),
+                       And([self.left.smt(env, t_i, end_time) for t_i in range(t_prime + 1, t + 1)]))
                    for t_prime in range(0, t + 1)])
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
@@ -1422,6 +2071,20 @@ class LTLSince(LTLFormula):
             )
         return False
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        left = self.left.truth_vector(env, test)
+        vector = self.right.truth_vector(env, test)
+        for index in range(1, len(test)):
+            vector[index] = vector[index] or (left[index] and vector[index - 1])
+        vector[-1] = False
+        return vector
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.left, index) | evaluator.update(self.right, index)
+        left, right = evaluator.vectors[id(self.left)], evaluator.vectors[id(self.right)]
+        return evaluator.sweep_forward(self, changed, False,
+                                       lambda position, earlier: right[position] or (left[position] and earlier))
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok1 = self.left.wellformed(symbols)
         ok2 = self.right.wellformed(symbols)
@@ -1446,11 +2109,19 @@ class LTLParen(LTLFormula):
         return self.subformula.get_any_args()
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        return self.subformula.to_smt(env, t, end_time)
+        return self.subformula.smt(env, t, end_time)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return self.subformula.evaluate(env, test, index)
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        return self.subformula.truth_vector(env, test)
+
+    def update_vector(self, evaluator: IncrementalEvaluator, index: Optional[int]) -> set[int]:
+        changed = evaluator.update(self.subformula, index)
+        subformula_vector = evaluator.vectors[id(self.subformula)]
+        return evaluator.assign(self, changed, subformula_vector.__getitem__)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.subformula.wellformed(symbols)
 
@@ -1477,17 +2148,20 @@ class LTLCountFuture(LTLFormula):
         return 0
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        counts = [
-            If(self.subformula.to_smt(env, t_prime, end_time), IntVal(1), IntVal(0))
-            for t_prime in range(t, end_time)
-        ]
-        total_count = Sum(counts)
-        return And(self.min <= total_count, total_count <= self.max)
+        literals = count_literals(lambda k: self.subformula.smt(env, k, end_time), t, end_time, end_time)
+        return count_constraint(literals, self.min, self.max)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         number = self.count(env, test, index)
         return self.min <= number <= self.max
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        subformula_vector = self.subformula.truth_vector(env, test)
+        counts = [0] * (len(test) + 1)
+        for index in range(len(test) - 1, -1, -1):
+            counts[index] = counts[index + 1] + (1 if subformula_vector[index] else 0)
+        return [self.min <= number <= self.max for number in counts]
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok_min = self.min >= 0
         ok_max = self.min <= self.max
@@ -1521,17 +2195,22 @@ class LTLCountPast(LTLFormula):
         return 0
 
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
-        counts = [
-            If(self.subformula.to_smt(env, t_prime, end_time), IntVal(1), IntVal(0))
-            for t_prime in range(0, t + 1)
-        ]
-        total_count = Sum(counts)
-        return And(total_count >= self.min, total_count <= self.max)
+        literals = count_literals(lambda k: self.subformula.smt(env, k, end_time), 0, t + 1, end_time)
+        return count_constraint(literals, self.min, self.max)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         number = self.count(env, test, index)
         return self.min <= number <= self.max
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        subformula_vector = self.subformula.truth_vector(env, test)
+        counts = [0] * (len(test) + 1)
+        number = 0
+        for index in range(len(test)):
+            number += 1 if subformula_vector[index] else 0
+            counts[index] = number
+        return [self.min <= number <= self.max for number in counts]
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         ok_min = self.min >= 0
         ok_max = self.min <= self.max
@@ -1557,15 +2236,27 @@ class LTLDerivedFormula(LTLFormula):
         """Expland a formula to a formula representing its meaning."""
         raise NotImplementedError("Subclasses should implement this!")
 
+    def desugar(self) -> LTLFormula:
+        return self.expand().desugar()
+
     def get_any_args(self) -> set[str]:
         return self.expand().get_any_args()
 
+    def get_command_names(self) -> set[str]:
+        return self.expand().get_command_names()
+
+    def temporal(self) -> bool:
+        return self.expand().temporal()
+
     def to_smt(self, env: Environment, t: int, end_time: int) -> BoolRef:
         return self.expand().to_smt(env, t, end_time)
 
     def evaluate(self, env: Environment, test: Test, index: int) -> bool:
         return self.expand().evaluate(env, test, index)
 
+    def truth_vector(self, env: Environment, test: Test) -> list[bool]:
+        return self.expand().truth_vector(env, test)
+
     def wellformed(self, symbols: SymbolTable) -> bool:
         return self.expand().wellformed(symbols)
 
@@ -1781,11 +2472,30 @@ class LTLMultiRelation(LTLDerivedFormula):
 
 @dataclass
 class LTLRule(ASTNode):
-    """(no)rule id: φ"""
+    """(no)rule id: φ
+
+    Attributes:
+        kw: 'rule' or 'norule'.
+        rule_name: the name of the rule.
+        formula: the formula as written, used for printing.
+        core_formula: the desugared formula, used for everything else. Computed by `desugar`.
+    """
 
     kw: str  # 'rule' or 'norule'
     rule_name: str
     formula: LTLFormula
+    core_formula: Optional[LTLFormula] = field(default=None, repr=False, compare=False)
+
+    @property
+    def core(self) -> LTLFormula:
+        """Returns the desugared formula, desugaring it first if that has not been done."""
+        if self.core_formula is None:
+            self.desugar()
+        return self.core_formula
+
+    def desugar(self):
+        """Expands the derived formulas in the rule once and for all."""
+        self.core_formula = self.formula.desugar()
 
     def to_str(self):
         result = ''
@@ -1801,20 +2511,61 @@ class LTLRule(ASTNode):
         ```
         :return: argument names mentioned in any-match formulas.
         """
-        return self.formula.get_any_args()
+        return self.core.get_any_args()
+
+    def get_command_names(self) -> set[str]:
+        """Returns the names of all commands mentioned in the rule, if active, except `any`.
+
+        :return: the command names.
+        """
+        return self.core.get_command_names() if self.active() else set()
 
     def active(self) -> bool:
         return self.kw == 'rule'
 
+    def lazy(self) -> bool:
+        """Returns True iff. the rule is active and of the form `always φ`, where φ contains
+        temporal operators, such that it can be translated to Z3 one instance at a time, where
+        instance t is φ at time t. If φ contains no temporal operators, the instances are small,
+        and are better translated at once.
+
+        :return: True iff. the rule can be translated one instance at a time.
+        """
+        return self.active() and isinstance(self.core, LTLAlways) and self.core.subformula.temporal()
+
+    def instance_to_smt(self, t: int, end_time: int) -> BoolRef:
+        """Returns a Z3 representation of instance t of a lazy rule, see `lazy`.
+
+        :param t: the time of the instance.
+        :param end_time: the end time of the timeline.
+        :return: the Z3 representation of the instance.
+        """
+        return self.core.subformula.smt({}, t, end_time)
+
+    def violations(self, test: Test) -> list[int]:
+        """Returns the instances of a lazy rule violated by a test, see `lazy`.
+
+        :param test: the test to evaluate the instances on.
+        :return: the times of the violated instances.
+        """
+        formula = self.core.subformula
+        if Options.EVALUATION_STRATEGY == EvaluationStrategy.RECURSIVE:
+            values = [formula.evaluate({}, test, t) for t in range(len(test))]
+        else:
+            values = formula.truth_vector({}, test)
+        return [t for t in range(len(test)) if not values[t]]
+
     def to_smt(self, end_time: int) -> BoolRef:
         if self.active():
-            return self.formula.to_smt({}, 0, end_time)
+            return self.core.smt({}, 0, end_time)
         else:
             return True
 
     def evaluate(self, test: Test) -> bool:
         if self.active():
-            return self.formula.evaluate({}, test, 0)
+            if Options.EVALUATION_STRATEGY in (EvaluationStrategy.VECTOR, EvaluationStrategy.INCREMENTAL):
+                return self.core.truth_vector({}, test)[0]
+            return self.core.evaluate({}, test, 0)
         else:
             return True
 
@@ -1822,7 +2573,7 @@ class LTLRule(ASTNode):
         if self.kw == 'norule':
             return True # we do not check the formula
         else:
-            if not self.formula.wellformed(SymbolTable()):
+            if not self.core.wellformed(SymbolTable()):
                 print('-------------------')
                 print(self.formula.to_str())
                 print('-------------------')
@@ -1861,13 +2612,47 @@ class LTLSpec(ASTNode):
             self.any_args = set([arg for rule in self.rules for arg in rule.get_any_args()])
         return self.any_args
 
-    def to_smt(self, end_time: int) -> BoolRef:
+    def get_command_names(self) -> set[str]:
+        """Returns the names of all commands mentioned in the active rules, except `any`.
+
+        :return: the command names.
+        """
+        return set([name for rule in self.rules for name in rule.get_command_names()])
+
+    def desugar(self):
+        """Expands the derived formulas in all rules once and for all."""
+        for rule in self.rules:
+            rule.desugar()
+
+    def to_smt(self, end_time: int, skeleton: bool = False) -> BoolRef:
+        """Returns a Z3 representation of the specification.
+
+        :param end_time: the end time of the timeline.
+        :param skeleton: if true, the specification is translated to a constraint on the
+          `skeleton` of command names only, abstracting from arguments, see `SMTContext`.
+        :return: the Z3 representation of the specification.
+        """
+        global smt_context
+        smt_context = SMTContext(skeleton)
         smt_formulas: list[BoolRef] = [rule.to_smt(end_time) for rule in self.rules]
-        return And(smt_formulas)
+        smt_context.report()
+        return And(smt_formulas + smt_context.definitions)
 
     def evaluate(self, test: Test) -> bool:
         return all(rule.evaluate(test) for rule in self.rules)
 
+    def evaluator(self, test: Test) -> Evaluator:
+        """Returns an evaluator for re-evaluating the specification on a test that is
+        changed one position at a time, as during refinement. The evaluator is
+        incremental if `Options.EVALUATION_STRATEGY` is `EvaluationStrategy.INCREMENTAL`.
+
+        :param test: the test, which is changed in place by the caller.
+        :return: the evaluator.
+        """
+        if Options.EVALUATION_STRATEGY == EvaluationStrategy.INCREMENTAL:
+            return IncrementalEvaluator(self, test)
+        return Evaluator(self, test)
+
     def wellformed(self) -> bool:
         names = [rule.rule_name for rule in self.rules]
         counts = Counter(names)
@@ -1877,3 +2662,240 @@ class LTLSpec(ASTNode):
             report(f'duplicate rule names: {duplicates}')
         ok_rules = all([rule.wellformed() for rule in self.rules])
         return ok_names and ok_rules
+
+
+# ==================================================================
+# Lazy translation of specifications
+# ==================================================================
+
+# The core formulas with temporal operators at the top.
+TEMPORAL_FORMULAS = (LTLEventually, LTLAlways, LTLNext, LTLWeakNext, LTLUntil, LTLOnce, LTLSofar,
+                     LTLPrevious, LTLWeakPrevious, LTLSince, LTLCountFuture, LTLCountPast)
+
+
+class LazyTranslation:
+    """Translation of a specification to Z3 for counterexample-guided generation of tests,
+    where the lazy rules (see `LTLRule.lazy`) are translated one instance at a time, when
+    violated by a model. The other rules are translated at once. All translations share
+    one `SMTContext`, such that auxiliary variables are defined consistently. The variables
+    representing fields of `any` command (see `SMTContext.any_field`) are all defined up front,
+    such that the constraints added for an instance do not depend on the instances added before.
+
+    Attributes:
+        spec: the specification.
+        end_time: the end time of the timeline.
+        context: the state shared by the translations.
+        instances: maps the index of a lazy rule and the time of an instance to its translation.
+        formula: the translation of the rules which are not lazy.
+    """
+
+    def __init__(self, spec: LTLSpec, end_time: int):
+        self.spec = spec
+        self.end_time = end_time
+        self.context = SMTContext()
+        self.instances: dict[tuple[int, int], BoolRef] = {}
+        for field_name in sorted(spec.get_any_args()):
+            for t in range(end_time):
+                self.context.any_field(field_name, t)
+        self.formula: BoolRef = self.translate(lambda: And(
+            [rule.to_smt(end_time) for rule in spec.rules if not rule.lazy()] + self.context.definitions))
+
+    def translate(self, translation: Callable[[], BoolRef]) -> BoolRef:
+        """Performs a translation in the context of this translation.
+
+        :param translation: performs the translation.
+        :return: the result of the translation.
+        """
+        global smt_context
+        smt_context = self.context
+        return translation()
+
+    def violations(self, test: Test) -> list[tuple[int, int]]:
+        """Returns the instances of the lazy rules violated by a test.
+
+        :param test: the test to evaluate the instances on.
+        :return: the index of the rule and the time of each violated instance.
+        """
+        return [(index, t) for index, rule in enumerate(self.spec.rules) if rule.lazy() for t in rule.violations(test)]
+
+    def instance(self, index: int, t: int) -> BoolRef:
+        """Returns the translation of an instance of a lazy rule. The auxiliary variables it depends on
+        are defined by `definitions`.
+
+        :param index: the index of the rule.
+        :param t: the time of the instance.
+        :return: the Z3 representation of the instance.
+        """
+        if (index, t) not in self.instances:
+            rule = self.spec.rules[index]
+            self.instances[(index, t)] = self.translate(lambda: rule.instance_to_smt(t, self.end_time))
+        return self.instances[(index, t)]
+
+    @property
+    def definitions(self) -> list[BoolRef]:
+        """The constraints defining the auxiliary variables introduced by the translations so far."""
+        return self.context.definitions
+
+
+# ==================================================================
+# Re-evaluation of changing tests
+# ==================================================================
+
+class Evaluator:
+    """Re-evaluates a specification on a test each time a position in the test is changed.
+
+    Attributes:
+        spec: the specification.
+        test: the test, which is changed in place by the user of the evaluator.
+    """
+
+    def __init__(self, spec: LTLSpec, test: Test):
+        self.spec = spec
+        self.test = test
+
+    def changed(self, index: int):
+        """Informs the evaluator that the command at position `index` has changed.
+
+        :param index: the position changed.
+        """
+        pass
+
+    def evaluate(self, index: int) -> bool:
+        """Evaluates the specification on the test after the command at position `index` has changed.
+
+        :param index: the position changed.
+        :return: True iff the test satisfies the specification.
+        """
+        return self.spec.evaluate(self.test)
+
+
+class IncrementalEvaluator(Evaluator):
+    """Evaluator keeping the truth vector (see `LTLFormula.truth_vector`) of each subformula
+    of the active rules, such that only positions depending on a changed position are recomputed.
+
+    Attributes:
+        vectors: maps the id of each formula to its truth vector.
+        changes: maps the id of each formula updated during the current evaluation
+          to the positions where its value changed.
+    """
+
+    def __init__(self, spec: LTLSpec, test: Test):
+        super().__init__(spec, test)
+        self.formulas: list[LTLFormula] = [rule.core for rule in spec.rules if rule.active()]
+        self.vectors: dict[int, list[bool]] = {}
+        self.changes: dict[int, set[int]] = {}
+        for formula in self.formulas:
+            self.update(formula, None)
+
+    def changed(self, index: int):
+        self.changes = {}
+        for formula in self.formulas:
+            self.update(formula, index)
+
+    def evaluate(self, index: int) -> bool:
+        self.changed(index)
+        return all(self.vectors[id(formula)][0] for formula in self.formulas)
+
+    def update(self, formula: LTLFormula, index: Optional[int]) -> set[int]:
+        """Updates the truth vector of a formula after a change, at most once per change,
+        since a formula can occur more than once in a desugared rule.
+
+        :param formula: the formula.
+        :param index: the position changed, or None if the vector has not been computed yet.
+        :return: the positions where the value of the formula changed.
+        """
+        key = id(formula)
+        if key not in self.changes:
+            self.changes[key] = formula.update_vector(self, index)
+        return self.changes[key]
+
+    def all_positions(self) -> set[int]:
+        """Returns all positions of a truth vector, including the position after the end of the test."""
+        return set(range(len(self.test) + 1))
+
+    def vector(self, formula: LTLFormula) -> list[bool]:
+        """Returns the truth vector of a formula, allocating it if not yet computed."""
+        key = id(formula)
+        if key not in self.vectors:
+            self.vectors[key] = [None] * (len(self.test) + 1)
+        return self.vectors[key]
+
+    def assign(self, formula: LTLFormula, positions: set[int], value: Callable[[int], bool]) -> set[int]:
+        """Recomputes the truth vector of a formula at some positions.
+
+        :param formula: the formula.
+        :param positions: the positions to recompute.
+        :param value: computes the value of the formula at a position.
+        :return: the positions where the value changed.
+        """
+        vector = self.vector(formula)
+        changed = set()
+        for position in positions:
+            new_value = value(position)
+            if vector[position] != new_value:
+                vector[position] = new_value
+                changed.add(position)
+        return changed
+
+    def sweep_backward(self, formula: LTLFormula, positions: set[int], end_value: bool,
+                       step: Callable[[int, bool], bool]) -> set[int]:
+        """Recomputes the truth vector of a future time formula defined by a one-step recurrence,
+        from the last of the given positions towards the start of the test, stopping at the
+        first position before the given positions where the value does not change.
+
+        :param formula: the formula.
+        :param positions: the positions where the subformulas changed.
+        :param end_value: the value after the end of the test.
+        :param step: computes the value at a position from the value at the next position.
+        :return: the positions where the value changed.
+        """
+        vector = self.vector(formula)
+        end = len(self.test)
+        changed = set()
+        if vector[end] != end_value:
+            vector[end] = end_value
+            changed.add(end)
+        if not positions:
+            return changed
+        first = min(positions)
+        for position in range(min(max(positions), end - 1), -1, -1):
+            new_value = step(position, vector[position + 1])
+            if vector[position] == new_value:
+                if position < first:
+                    break
+            else:
+                vector[position] = new_value
+                changed.add(position)
+        return changed
+
+    def sweep_forward(self, formula: LTLFormula, positions: set[int], end_value: bool,
+                      step: Callable[[int, bool], bool]) -> set[int]:
+        """Recomputes the truth vector of a past time formula defined by a one-step recurrence,
+        from the first of the given positions towards the end of the test, stopping at the
+        first position after the given positions where the value does not change.
+
+        :param formula: the formula.
+        :param positions: the positions where the subformulas changed.
+        :param end_value: the value before the start and after the end of the test.
+        :param step: computes the value at a position from the value at the previous position.
+        :return: the positions where the value changed.
+        """
+        vector = self.vector(formula)
+        end = len(self.test)
+        changed = set()
+        if vector[end] != end_value:
+            vector[end] = end_value
+            changed.add(end)
+        if not positions:
+            return changed
+        last = max(positions)
+        for position in range(min(positions), end):
+            earlier = vector[position - 1] if position > 0 else end_value
+            new_value = step(position, earlier)
+            if vector[position] == new_value:
+                if position > last:
+                    break
+            else:
+                vector[position] = new_value
+                changed.add(position)
+        return changed
@@ -4,16 +4,67 @@ This module defines the grammar and parser for the constraint language.
 It uses the lark parser generator: https://github.com/lark-parser/lark.
 """
 
+from typing import Dict, Tuple
+
 from lark import Lark, Transformer, v_args, Tree, Token
 from graphviz import Digraph
 
-from fuzz.options import Options
+from fuzz.options import Options, Parser
 from fuzz.ltl_ast import *
 
 # ============
 # The grammar.
 # ============
 
+# Expressions, constraints and the remaining terminals, shared by the formula grammars below.
+
+expression_grammar = r"""
+?expression: sum
+
+?sum: product
+    | sum "+" product         -> addexpr
+    | sum "-" product         -> subexpr
+
+?product: primary
+        | product "*" primary -> mulexpr
+        | product "/" primary -> divexpr
+
+?primary: ID                  -> idexpr
+        | INT                 -> intexpr
+        | FLOAT               -> floatexpr
+        | STRING              -> stringexpr
+        | ID "." ID           -> enumexpr
+        | "(" expression ")"  -> parenexpr
+
+?regexp: REGEX_BODY
+
+constraints: constraint ("," constraint)*   -> constraint_list
+
+constraint: ID "=" ID                       -> varconstraint
+          | ID "=" ID "?"                   -> varbinding 
+          | ID "=" INT                      -> intconstraint
+          | ID "=" FLOAT                    -> floatconstraint
+          | ID "=" STRING                   -> stringconstraint
+          | ID "=" ID "." ID                -> enumconstraint 
+
+RELOP: "<" | "<=" | "=" | "!=" | ">=" | ">"
+
+COMMENT: /\#[^\r\n]*/x 
+
+REGEX_BODY: /\/(?:(\\.)|[^\/\\\s])+(?:(\\.)|[^\/\\\s])*?\//
+
+%import common.CNAME -> ID
+%import common.ESCAPED_STRING -> STRING
+%import common.SIGNED_INT -> INT
+%import common.SIGNED_FLOAT -> FLOAT
+
+%import common.WS
+%ignore WS
+%ignore COMMENT
+"""
+
+# The grammar parsed with the Earley parser, which resolves the ambiguities.
+
 grammar = r"""
 ?start: specification
 
@@ -56,34 +107,6 @@ grammar = r"""
         | formula THEN formula              -> then                      // DERIVED
         | formula AFTER formula             -> after                     // DERIVED
         
-?expression: sum
-
-?sum: product
-    | sum "+" product         -> addexpr
-    | sum "-" product         -> subexpr
-
-?product: primary
-        | product "*" primary -> mulexpr
-        | product "/" primary -> divexpr
-
-?primary: ID                  -> idexpr
-        | INT                 -> intexpr
-        | FLOAT               -> floatexpr
-        | STRING              -> stringexpr
-        | ID "." ID           -> enumexpr
-        | "(" expression ")"  -> parenexpr
-
-?regexp: REGEX_BODY
-
-constraints: constraint ("," constraint)*   -> constraint_list
-
-constraint: ID "=" ID                       -> varconstraint
-          | ID "=" ID "?"                   -> varbinding 
-          | ID "=" INT                      -> intconstraint
-          | ID "=" FLOAT                    -> floatconstraint
-          | ID "=" STRING                   -> stringconstraint
-          | ID "=" ID "." ID                -> enumconstraint 
-
 RULE: "rule" | "norule"
 
 NOT: "not" | "!"
@@ -112,23 +135,140 @@ THEN: "then" | "~>"
 AFTER: "after" | "~*>"
 COUNT: "count" | "@"
 COUNTPAST: "countpast" | "@*"
-RELOP: "<" | "<=" | "=" | "!=" | ">=" | ">"
 INREG: "matches" | "|-"
 REQUIRED: "?" | "!"
+""" + expression_grammar
 
-COMMENT: /\#[^\r\n]*/x 
+# The grammar parsed with the LALR parser, where the ambiguities are resolved by precedence.
 
-REGEX_BODY: /\/(?:(\\.)|[^\/\\\s])+(?:(\\.)|[^\/\\\s])*?\//
+lalr_grammar = r"""
+?start: specification
 
-%import common.CNAME -> ID
-%import common.ESCAPED_STRING -> STRING
-%import common.SIGNED_INT -> INT
-%import common.SIGNED_FLOAT -> FLOAT
+?specification: rule* -> spec
 
-%import common.WS
-%ignore WS
-%ignore COMMENT
-"""
+?rule: _rule ID ":" formula -> rule
+
+// Binary operators bind from loosest to tightest in the order: ->, or, and, until, wuntil,
+// since, wsince, then, after, and are all left associative. A prefix operator takes as operand
+// a formula at the level of its own binding (command matches: or, always and eventually: until,
+// the remaining prefix operators: then), but never at a looser level than the one at which the
+// prefix operator itself occurs. Hence each level is parameterized with the atoms occurring in
+// it, where atom_n is an atom occurring at level n. A prefix operator whose operand is at the
+// level it occurs at extends as far to the right as possible (the parser prefers shifting).
+
+?formula: implies{atom_2}
+
+?implies{atom}: implies{atom} _implies or{atom_2} -> implies
+              | or{atom}
+?or{atom}: or{atom} _or and{atom_3} -> or_
+         | and{atom}
+?and{atom}: and{atom} _and until{atom_4} -> and_
+          | until{atom}
+?until{atom}: until{atom} _until wuntil{atom_5} -> until
+            | wuntil{atom}
+?wuntil{atom}: wuntil{atom} _wuntil since{atom_6} -> weakuntil
+             | since{atom}
+?since{atom}: since{atom} _since wsince{atom_7} -> since
+            | wsince{atom}
+?wsince{atom}: wsince{atom} _wsince then{atom_8} -> weaksince
+             | then{atom}
+?then{atom}: then{atom} _then after{atom_9} -> then
+           | after{atom}
+?after{atom}: after{atom} _after atom_10 -> after
+            | atom
+
+?atom_2: match_prefix{or{atom_2}}
+       | always_prefix{until{atom_4}}
+       | unary_prefix{then{atom_8}}
+       | primary_formula
+?atom_3: match_prefix{and{atom_3}}
+       | always_prefix{until{atom_4}}
+       | unary_prefix{then{atom_8}}
+       | primary_formula
+?atom_4: match_prefix{until{atom_4}}
+       | always_prefix{until{atom_4}}
+       | unary_prefix{then{atom_8}}
+       | primary_formula
+?atom_5: match_prefix{wuntil{atom_5}}
+       | always_prefix{wuntil{atom_5}}
+       | unary_prefix{then{atom_8}}
+       | primary_formula
+?atom_6: match_prefix{since{atom_6}}
+       | always_prefix{since{atom_6}}
+       | unary_prefix{then{atom_8}}
+       | primary_formula
+?atom_7: match_prefix{wsince{atom_7}}
+       | always_prefix{wsince{atom_7}}
+       | unary_prefix{then{atom_8}}
+       | primary_formula
+?atom_8: match_prefix{then{atom_8}}
+       | always_prefix{then{atom_8}}
+       | unary_prefix{then{atom_8}}
+       | primary_formula
+?atom_9: match_prefix{after{atom_9}}
+       | always_prefix{after{atom_9}}
+       | unary_prefix{after{atom_9}}
+       | primary_formula
+?atom_10: match_prefix{atom_10}
+        | always_prefix{atom_10}
+        | unary_prefix{atom_10}
+        | primary_formula
+
+?primary_formula: ID "(" constraints? ")"      -> predicate
+       | expression RELOP expression       -> relation
+       | expression RELOP expression RELOP expression  -> multirelation // DERIVED
+       | "(" formula ")"                   -> parens
+       | "true"                            -> true
+       | "false"                           -> false
+       | expression _inreg regexp          -> inregexp
+
+?match_prefix{operand}: ID "(" constraints? ")" (_ifthen | _andthen) operand -> commandmatch
+        | "[" ID "(" constraints? ")" "]" operand -> commandmatch_ifthen
+        | "<" ID "(" constraints? ")" ">" operand -> commandmatch_andthen
+
+?always_prefix{operand}: _always operand  -> always
+        | _eventually operand                -> eventually
+
+?unary_prefix{operand}: _sofar operand    -> sofar
+        | _once operand                      -> once
+        | _next operand                      -> next
+        | _wnext operand                     -> weak_next
+        | _prev operand                      -> prev
+        | _wprev operand                     -> weak_prev
+        | _not operand                       -> not_
+        | _count "(" INT "," INT ")" operand -> countfuture               // NOT LTL
+        | _countpast "(" INT "," INT ")" operand -> countpast             // NOT LTL
+        | _count INT operand                 -> countfutureexact          // DERIVED
+        | _countpast INT operand             -> countpastexact            // DERIVED
+        | _next INT operand                  -> nexttimes                 // DERIVED
+        | _prev INT operand                  -> prevtimes                 // DERIVED
+// Keywords are given as strings, such that the lexer distinguishes them from identifiers.
+
+!_rule: "rule" | "norule"
+!_not: "not" | "!"
+!_implies: "implies" | "->"
+!_or: "or" | "|"
+!_and: "and" | "&"
+!_always: "always" | "[]"
+!_eventually: "eventually" | "<>"
+!_until: "until" | "U"
+!_wuntil: "wuntil" | "WU"
+!_next: "next" | "()"
+!_wnext: "wnext" | "()?"
+!_sofar: "sofar" | "[*]"
+!_once: "once" | "<*>"
+!_since: "since" | "S"
+!_wsince: "wsince" | "WS"
+!_prev: "prev" | "(*)"
+!_wprev: "wprev" | "(*)?"
+!_ifthen: "ifthen" | "=>"
+!_andthen: "andthen" | "&>"
+!_then: "then" | "~>"
+!_after: "after" | "~*>"
+!_count: "count" | "@"
+!_countpast: "countpast" | "@*"
+!_inreg: "matches" | "|-"
+""" + expression_grammar
 
 regexp_grammar = r"""
 ?start: re_expr
@@ -176,7 +316,7 @@ class FormulaTransformer(Transformer):
         return LTLSpec(list(rules))
 
     def rule(self, kw, name, formula):
-        return LTLRule(kw, name, formula)
+        return LTLRule(str(kw), name, formula)
 
     def implies(self, left, kw, right):
         return LTLImplies(left, right)
@@ -194,7 +334,7 @@ class FormulaTransformer(Transformer):
             raise ValueError("Unexpected number of arguments in commandmatch")
         for constraint in constraints:
             constraint.command_name = id_
-        return LTLCommandMatch(id_, constraints, kw, formula)
+        return LTLCommandMatch(id_, constraints, str(kw), formula)
 
     def commandmatch_ifthen(self, id_, *args):
         if len(args) == 1:
@@ -358,7 +498,7 @@ class FormulaTransformer(Transformer):
     def inregexp(self, expr, kw, regexp):
         regex_literal = str(regexp)
         regex_text = regex_literal[1:-1]
-        regex_tree = regexp_parser.parse(regex_text)
+        regex_tree = get_parser('regexp').parse(regex_text)
         z3_regex = RegExpTransformer().transform(regex_tree)
         # inspect(z3_regex)
         return LTLInRegExp(expr, z3_regex, regexp[1:-1])
@@ -509,7 +649,27 @@ def visualize_sub_tree(tree: Tree, graph=None, parent=None):
 # The parsing function.
 # =====================
 
-regexp_parser = Lark(regexp_grammar, parser="earley")
+# The parsers constructed so far, indexed by grammar name and parsing algorithm.
+parsers: Dict[Tuple[str, Parser], Lark] = {}
+
+def get_parser(name: str) -> Lark:
+    """Returns the parser for a grammar, using the parsing algorithm selected
+    by `Options.PARSER`. Each parser is only constructed once. LALR parsers are
+    furthermore cached on disk by lark, such that a new process does not have to
+    compile the grammar again.
+
+    :param name: the grammar, either 'spec' or 'regexp'.
+    :return: the parser.
+    """
+    key = (name, Options.PARSER)
+    if key not in parsers:
+        if Options.PARSER == Parser.LALR:
+            text = lalr_grammar if name == 'spec' else regexp_grammar
+            parsers[key] = Lark(text, parser="lalr", cache=True)
+        else:
+            text = grammar if name == 'spec' else regexp_grammar
+            parsers[key] = Lark(text, parser="earley")
+    return parsers[key]
 
 def parse_spec(spec: str) -> LTLSpec:
     """Parses the specification, generates an AST,
@@ -519,12 +679,12 @@ def parse_spec(spec: str) -> LTLSpec:
     :param spec: the specification of constraints.
     :return: the AST representing the specification.
     """
-    parser = Lark(grammar, parser="earley")
     try:
-        tree = parser.parse(spec)
+        tree = get_parser('spec').parse(spec)
         if Options.GRAPH_PARSE_TREE:
             visualize_parse_tree(tree)
         ast: LTLSpec = FormulaTransformer().transform(tree)
+        ast.desugar()
         # headline('AST')
         # ast.pretty_print()
         headline('SPECIFICATION')
@@ -4,6 +4,7 @@ Options that can be set by the user.
 """
 
 from enum import Enum
+from typing import Optional
 
 class RefinementStrategy(Enum):
     """ Controls how refinements are done
@@ -11,6 +12,40 @@ class RefinementStrategy(Enum):
     SMT = 1          # each refinement is generated by the SMT solver
     EVAL = 2         # each refinement is manually constructed by editing the test, command by command
     EVAL_PER_ARG = 3 # each refinement is manually constructed by editing the test, argument by argument
+    NONE = 4         # no refinement, the test is the first model found by the solver
+
+class TemporalEncoding(Enum):
+    """ Controls how temporal operators are translated to Z3
+    """
+    UNROLL = 1      # each occurrence of an operator is unrolled over all the time points it refers to
+    RECURRENCE = 2  # each operator gets an auxiliary variable per time point, defined by its one-step recurrence
+    QUANTIFIED = 3  # each operator is a quantifier over a bounded integer time variable, independent of the test size
+
+class EvaluationStrategy(Enum):
+    """ Controls how formulas are evaluated on tests
+    """
+    RECURSIVE = 1  # each formula is evaluated at one position, recursing over the positions it refers to
+    VECTOR = 2     # each formula is evaluated at all positions at once, in one sweep over the test
+    INCREMENTAL = 3  # as VECTOR, but refinement only re-evaluates the positions affected by a change
+
+class Parser(Enum):
+    """ Controls which parsing algorithm is used for specifications and regular expressions
+    """
+    EARLEY = 1  # the ambiguous grammar, disambiguated by the Earley parser
+    LALR = 2    # the precedence-layered grammar, parsed in linear time, and cached on disk, which
+                # gives some chains of binary operators a different grouping than EARLEY
+
+class CommandSubset(Enum):
+    """ Controls which commands are represented by constructors of the Z3 `Command` datatype
+    """
+    ALL = 1         # every command in the command dictionary
+    REFERENCED = 2  # the commands referenced in the specification, all others are represented by one OTHER constructor
+
+class TimelineEncoding(Enum):
+    """ Controls how the commands of a test are represented in Z3
+    """
+    DATATYPE = 1  # a function `timeline` from time points to values of the algebraic datatype `Command`
+    FLAT = 2      # an integer opcode variable per time point, and a scalar variable per time point and argument
 
 class Options:
     # Debugging level
@@ -26,5 +61,76 @@ class Options:
     # Drives how the refinement of a test is performed.
     REFINEMENT_STRATEGY: RefinementStrategy = RefinementStrategy.EVAL_PER_ARG
 
+    # With REFINEMENT_STRATEGY = SMT, the number of positions attempted replaced by random commands
+    # in one check. An unsatisfiable batch is bisected to find the positions to keep.
+    REFINEMENT_BATCH_SIZE: int = 8
+
     # If true, the Z3 constraints are printed
     PRINT_CONSTRAINTS: bool = False
+
+    # If true, one solver is shared by all tests in a test suite. The constraints are
+    # asserted once, and each test is generated inside a push/pop scope.
+    INCREMENTAL_SOLVING: bool = False
+
+    # If true (and INCREMENTAL_SOLVING is true), each test is required to differ from
+    # the previously generated tests in at least one command name, if possible.
+    DIVERSITY_CONSTRAINTS: bool = False
+
+    # If true, each test is solved in two phases: first the command names are solved from a
+    # constraint on the names only, abstracting from arguments. Then the arguments are solved with
+    # the command names fixed. If that fails, the command names are solved again with the arguments.
+    # Not used with INCREMENTAL_SOLVING.
+    TWO_PHASE_SOLVING: bool = False
+
+    # If true, rules of the form `always φ` are not translated to Z3 up front. Instead, each time
+    # the solver finds a model, the instances φ at time t violated by the model are added, until
+    # the model satisfies the specification.
+    LAZY_UNROLLING: bool = False
+
+    # Drives how temporal operators are translated to Z3.
+    TEMPORAL_ENCODING: TemporalEncoding = TemporalEncoding.UNROLL
+
+    # If true, each solver gets a random seed drawn from the Python random number generator and
+    # random initial values of arithmetic variables, and each test is solved assuming a random command
+    # name at each time point, dropping the assumptions which conflict, such that the first model found
+    # is diverse. Intended for REFINEMENT_STRATEGY = NONE.
+    RANDOMIZED_SOLVING: bool = False
+
+    # The timeout in milliseconds of each check of a solver, or None for no timeout. A check which
+    # times out is treated as failed: refinement keeps the command attempted replaced, and when
+    # generating tests within a time budget, the test is skipped.
+    CHECK_TIMEOUT: Optional[int] = None
+
+    # Drives how the commands of a test are represented in Z3.
+    # FLAT cannot be combined with TEMPORAL_ENCODING = QUANTIFIED.
+    TIMELINE_ENCODING: TimelineEncoding = TimelineEncoding.DATATYPE
+
+    # Drives how formulas are evaluated on tests, when verifying and refining tests.
+    EVALUATION_STRATEGY: EvaluationStrategy = EvaluationStrategy.RECURSIVE
+
+    # Drives which parser is used for specifications and regular expressions.
+    # EARLEY defines the meaning of specifications, LALR only agrees with it where
+    # chains of binary operators are parenthesized.
+    PARSER: Parser = Parser.EARLEY
+
+    # The directory in which the enumeration types and commands extracted from each XML file
+    # are cached, keyed by the path, size and contents of the file. If None, nothing is cached.
+    # A relative path is resolved against the current working directory.
+    COMMAND_CACHE_DIR: Optional[str] = None
+
+    # The maximal number of processes parsing XML files which are not cached. With the default 1,
+    # the files are parsed one after the other in the current process, and no pool is started.
+    # With N > 1, they are parsed in parallel by a pool of at most N processes, and with None,
+    # by a pool of as many processes as there are CPUs. The processes are started with the
+    # `spawn` method, so a script parsing in parallel must guard its main code with
+    # `if __name__ == '__main__':`.
+    PARSE_WORKERS: Optional[int] = 1
+
+    # Drives which commands are represented by constructors of the Z3 `Command` datatype.
+    # With REFERENCED, positions in a test solved as OTHER are filled with random commands
+    # not referenced in the specification.
+    COMMAND_SUBSET: CommandSubset = CommandSubset.ALL
+
+    # With COMMAND_SUBSET = REFERENCED, the number of commands not referenced in the specification
+    # which are sampled to be represented by constructors as well.
+    COMMAND_SAMPLE_SIZE: int = 0
@@ -2,7 +2,12 @@
 Z3 solver functions.
 """
 import time
-from typing import Optional, List
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Optional, List, Dict, Tuple, Iterable, Iterator, ContextManager
 
 from fuzz.options import *
 from fuzz.ltl_grammar import *
@@ -18,7 +23,11 @@ def print_model(model: ModelRef, end_time: int):
     headline("SOLUTION FOUND")
     for i in range(end_time):
         try:
-            cmd = model.eval(timeline(i), model_completion=False)
+            if use_flat_timeline():
+                name, arguments = flat_timeline.evaluate(model, i)
+                cmd = f'{name}({", ".join(str(value) for value in arguments.values())})'
+            else:
+                cmd = model.eval(timeline(i), model_completion=False)
             print(f'{i:3}: {cmd}')
         except Exception as e:
             print(f'{i:3}: Error evaluating timeline({i}): {e}')
@@ -54,7 +63,8 @@ def print_tests(tests: List[List[dict]]):
 def extract_command(command: Command, model: ModelRef) -> dict:
     """
     Extracts information from a Z3 Command datatype instance dynamically using
-    the number of constructors and their fields.
+    the number of constructors and their fields. An `OTHER` command is replaced by
+    a random command among those it represents.
 
     :param command: The Z3 Command datatype instance to extract data from.
     :param model: The Z3 model used to evaluate the values.
@@ -66,6 +76,8 @@ def extract_command(command: Command, model: ModelRef) -> dict:
         constructor_name = constructor.name()
         is_constructor = getattr(Command, f'is_{constructor_name}')
         if model.eval(is_constructor(command)):
+            if constructor_name == OTHER:
+                return command_dictionary.generate_random_dict_command(command_dictionary.other_commands)
             data = {'name': constructor_name}
             for j in range(constructor.arity()):
                 field_selector = Command.accessor(i, j)
@@ -77,17 +89,65 @@ def extract_command(command: Command, model: ModelRef) -> dict:
     raise ValueError("Unknown command type")
 
 
-def solve_formula(solver: Solver, formula: BoolRef, end_time: int) -> Optional[ModelRef]:
+def extract_test(model: ModelRef, end_time: int) -> Test:
+    """Extracts the commands of a test from a model in one pass. The command at each time point
+    is evaluated once, and its name and arguments are read from the resulting constructor
+    application, rather than evaluating each recognizer and accessor as `extract_command` does.
+    An `OTHER` command is replaced by a random command among those it represents.
+
+    :param model: the model.
+    :param end_time: the end time of the timeline.
+    :return: the test.
+    """
+    test: Test = []
+    if use_flat_timeline():
+        for t in range(end_time):
+            name, arguments = flat_timeline.evaluate(model, t)
+            if name == OTHER:
+                test.append(command_dictionary.generate_random_dict_command(command_dictionary.other_commands))
+            else:
+                test.append({'name': name, **{arg_name: convert_z3_value(value) for arg_name, value in arguments.items()}})
+        return test
+    field_names: dict[str, list[str]] = {}
+    for i in range(Command.num_constructors()):
+        constructor_name = Command.constructor(i).name()
+        field_names[constructor_name] = [Command.accessor(i, j).name()[len(constructor_name) + 1:]
+                                         for j in range(Command.constructor(i).arity())]
+    for t in range(end_time):
+        command = model.eval(timeline(t), model_completion=True)
+        name = command.decl().name()
+        if name == OTHER:
+            test.append(command_dictionary.generate_random_dict_command(command_dictionary.other_commands))
+        elif name in field_names and command.num_args() == len(field_names[name]):
+            test.append({'name': name, **{field_name: convert_z3_value(command.arg(j))
+                                          for j, field_name in enumerate(field_names[name])}})
+        else:
+            test.append(extract_command(command, model))
+    return test
+
+
+def solve_formula(solver: Solver, formula: BoolRef, end_time: int, names: Optional[List[str]] = None) -> Optional[ModelRef]:
     """Adds a formula to a solver and checks whether it has a model, which is returned if so.
 
     :param solver: the solver to add the formula to.
     :param formula: the formula to add to the solver.
     :param end_time: the end time of the timeline.
+    :param names: optional command names of the timeline, see `solve_skeleton`. The names are
+      assumed when checking the formula, and are dropped if the formula has no model with them.
     :return: A model if the formula results in a model, and `None` if not.
     """
-    solver.add(formula)
-    if solver.check() == sat:
-        model = solver.model()
+    add_constraint(solver, formula)
+    result = unknown
+    if names is not None:
+        fixed = Bool('fixed_skeleton')
+        add_constraint(solver, Implies(fixed, And([smt_is_command(name, t) for t, name in enumerate(names)])))
+        result = solver.check(fixed if solver.ctx is main_ctx() else fixed.translate(solver.ctx))
+        if result != sat:
+            debug(1, f'no arguments for the command names {names}, solving without them')
+    if result != sat:
+        result = check_test(solver, end_time)
+    if result == sat:
+        model = get_model(solver)
         if Options.DEBUG_LEVEL >= 1:
             print_model(model, end_time)
         return model
@@ -96,30 +156,74 @@ def solve_formula(solver: Solver, formula: BoolRef, end_time: int) -> Optional[M
         return None
 
 
+def solve_skeleton(skeleton_formula: BoolRef, end_time: int, fresh_context: bool = False,
+                   timeout: Optional[int] = None) -> Optional[List[str]]:
+    """Solves the command names of a test from a constraint on the `skeleton` of command names.
+
+    :param skeleton_formula: the constraint, see `generate_skeleton_formula`.
+    :param end_time: the end time of the timeline.
+    :param fresh_context: if true, the constraint is solved in a new Z3 context.
+    :param timeout: the timeout of the check, see `new_solver`.
+    :return: the command names of the test, or `None` if the constraint has no model.
+    """
+    solver = new_solver(fresh_context, timeout=timeout)
+    add_constraint(solver, skeleton_formula)
+    if solver.check() != sat:
+        debug(1, 'no command names satisfy the specification abstracted from arguments')
+        return None
+    model = get_model(solver)
+    return [model.eval(skeleton(t), model_completion=True).decl().name() for t in range(end_time)]
+
+
 def refine_solver_using_to_smt(ast: LTLSpec, solver: Solver, end_time: int) -> Test:
     """Refines a solver using Z3 itself, and returns a resulting test.
 
+    Each position is attempted constrained to a random command, which is kept if the solver
+    remains satisfiable with the commands kept so far. `Options.REFINEMENT_BATCH_SIZE` positions
+    are attempted per check, inside a `push()`/`pop()` scope. A satisfiable batch is added again
+    after the scope, where Z3 can propagate it into the other constraints, and an unsatisfiable
+    batch is bisected. The number of checks hence grows with the number of rejected positions
+    rather than with the length of the test. The test is extracted once, from the model of the
+    last satisfiable check, such that a final check, which could time out, is not needed.
+
     :param ast: the specifiation of constraints.
-    :param solver: the solver.
+    :param solver: the solver, which must be in a satisfiable state.
     :param end_time: the end time of the timeline.
     :return: the test extracted from the final extracted model.
     """
     debug(3, 'Refining solution')
-    for i in range(end_time):
-        solver.push()
-        command = command_dictionary.generate_random_smt_command()
-        solver.add(timeline(i) == command)
-        if solver.check() == sat:
-            debug(3, f'-- refinement step {i}: changed=True')
-            extract_and_verify_test(ast, solver.model(), end_time)
-            solver.pop()  # Undo temporary changes
-            solver.add(timeline(i) == command)  # Keep the satisfiable constraint
-        else:
-            debug(3, f'refinement step {i}: changed=False')
-            solver.pop()  # Remove unsatisfiable constraint
-    if solver.check() != sat:
-        raise AssertionError('Model not satisfiable as expected')
-    refined_model = solver.model()
+    commands = [command_dictionary.generate_random_smt_command(i) for i in range(end_time)]
+    model: ModelRef = solver.model()
+
+    def attempt(positions: range, known_unsat: bool = False) -> bool:
+        """Attempts the random commands at some positions, and returns true if all are kept.
+        If `known_unsat` is true, the commands are known to be unsatisfiable together.
+        """
+        nonlocal model
+        if not known_unsat:
+            batch = And([commands[i] for i in positions])
+            solver.push()
+            add_constraint(solver, batch)
+            result = solver.check()
+            if result == sat:
+                model = solver.model()
+            solver.pop()
+            if result == sat:
+                debug(3, f'-- refinement steps {positions.start}-{positions.stop - 1}: changed=True')
+                add_constraint(solver, batch)
+                return True
+        if len(positions) == 1:
+            debug(3, f'refinement step {positions.start}: changed=False')
+            return False
+        middle = (positions.start + positions.stop) // 2
+        # If the first half is kept, the second half is unsatisfiable with it
+        attempt(range(middle, positions.stop), attempt(range(positions.start, middle)))
+        return False
+
+    batch_size = max(1, Options.REFINEMENT_BATCH_SIZE)
+    for start in range(0, end_time, batch_size):
+        attempt(range(start, min(start + batch_size, end_time)))
+    refined_model = model if solver.ctx is main_ctx() else model.translate(main_ctx())
     test = extract_and_verify_test(ast, refined_model, end_time)
     if Options.DEBUG_LEVEL >= 1:
         print_test(test)
@@ -139,16 +243,18 @@ def refine_solver_using_evaluate(ast: LTLSpec, solver: Solver, end_time: int) ->
     :return: the final test.
     """
     debug(3, 'Refining solution')
-    test = extract_and_verify_test(ast, solver.model(), end_time).copy()
+    test = extract_and_verify_test(ast, get_model(solver), end_time).copy()
+    evaluator = ast.evaluator(test)
     for i in range(end_time):
         old_command = test[i]
         new_command = command_dictionary.generate_random_dict_command()
         test[i] = new_command
-        if ast.evaluate(test):
+        if evaluator.evaluate(i):
             debug(3, f'-- refinement step {i}: replacing {old_command} with {new_command}')
         else:
             debug(3, f'refinement step {i}: keeping {old_command}')
             test[i] = old_command
+            evaluator.changed(i)
     if not ast.evaluate(test):
         raise AssertionError('Model not satisfiable as expected')
     if Options.DEBUG_LEVEL >= 1:
@@ -169,7 +275,8 @@ def refine_solver_using_evaluate_per_arg(ast: LTLSpec, solver: Solver, end_time:
     :return: the final test.
     """
     debug(3, 'Refining solution')
-    test = extract_and_verify_test(ast, solver.model(), end_time).copy()
+    test = extract_and_verify_test(ast, get_model(solver), end_time).copy()
+    evaluator = ast.evaluator(test)
     for i in range(end_time):
         debug(3, '---')
         old_command = test[i]
@@ -179,7 +286,7 @@ def refine_solver_using_evaluate_per_arg(ast: LTLSpec, solver: Solver, end_time:
             for field in ast.get_any_args():
                 new_command[field] = old_command[field]
             test[i] = new_command
-            if ast.evaluate(test):
+            if evaluator.evaluate(i):
                 replaced_whole_command = True
                 break
             else:
@@ -189,6 +296,7 @@ def refine_solver_using_evaluate_per_arg(ast: LTLSpec, solver: Solver, end_time:
         else:
             debug(3, f'refinement step {i}: keeping {old_command}, rejecting {new_command}, now trying argument by argument')
             test[i] = old_command
+            evaluator.changed(i)
             random_args = command_dictionary.generate_random_arguments_for_command(test[i]['name'])
             for arg_name, arg_value in random_args.items():
                 if arg_name in ast.get_any_args():
@@ -197,9 +305,10 @@ def refine_solver_using_evaluate_per_arg(ast: LTLSpec, solver: Solver, end_time:
                     old_value = test[i][arg_name]
                     test[i][arg_name] = arg_value
                     debug(3, f'refining {arg_name} from {old_value} to {arg_value} -> {test[i]}')
-                    if not ast.evaluate(test):
+                    if not evaluator.evaluate(i):
                         debug(3, f'that did not work, restoring old value {old_value}')
                         test[i][arg_name] = old_value
+                        evaluator.changed(i)
                     else:
                         debug(3, 'that worked')
     if not ast.evaluate(test):
@@ -209,24 +318,365 @@ def refine_solver_using_evaluate_per_arg(ast: LTLSpec, solver: Solver, end_time:
     return test
 
 
-def generate_tests(spec: Optional[str] = None, test_suite_size: Optional[int] = None, test_size: Optional[int] = None) -> TestSuite:
+def generate_tests(spec: Optional[str] = None, test_suite_size: Optional[int] = None, test_size: Optional[int] = None,
+                   workers: Optional[int] = None, seed: Optional[int] = None,
+                   time_budget: Optional[float] = None) -> TestSuite:
     """Generates tests from XML files describing commands and their types.
 
     The specification is the concatenation of two specification files:
     1) the specification extracted from the specification file identified by
     the configuration file, or "" if not identified.
     2) the specification provided as argument, if provided, or "" if `None`.
-    The test suite size and test size are extracted
+    The test suite size, test size, number of workers and seed are extracted
     from the configuration file if `None`.
 
-    The returned test is also stored in the file `testsuite.json`.
+    If more than one worker is requested, the tests are generated in parallel by a pool
+    of worker processes. If a seed is provided, or more than one worker is requested,
+    test number `i` is generated with the random seed `seed + i` in a fresh Z3 context,
+    such that, given a seed, the resulting test suite is the same regardless of the
+    number of workers (except with `Options.INCREMENTAL_SOLVING`, where all tests share
+    one solver).
+
+    If a time budget is provided, tests are generated until the budget is exhausted, or until
+    `test_suite_size` tests have been generated if provided, see `CompiledSpec.generate_within`,
+    and a report of the generation is printed.
+
+    The returned test suite is also stored in the file `fuzz-testsuite.json` in the current
+    directory, once all tests have been generated. If the configuration file identifies a JSONL
+    file with the key `jsonl_file`, each test is in addition appended to that file as one line
+    as soon as it has been generated, see `append_tests`.
 
     :param spec: an optional specification of constraints.
     :param test_suite_size: an optional number indicating number of tests to generate.
     :param test_size: an optional number of commands to generate in each test.
+    :param workers: an optional number of processes generating tests in parallel.
+    :param seed: an optional seed from which the random seed of each test is derived.
+    :param time_budget: an optional time budget in seconds for generating the test suite, within
+      which tests are generated sequentially and any `workers` is ignored. If `None`, there is no budget.
     :return: the testsuite, a list of lists of dictionaries, each representing a command.
     """
     start_time = time.time()
+    command_dictionary.print_dictionaries()
+    if time_budget is None:
+        generated: Iterable[Test] = compile_spec(spec).iter_tests(test_suite_size, test_size, workers, seed)
+    else:
+        report = compile_spec(spec).generate_within(time_budget, test_suite_size, test_size, seed)
+        print(report)
+        generated = report.tests
+    if command_dictionary.jsonl_file is not None:
+        generated = append_tests(generated, command_dictionary.jsonl_file)
+    tests: TestSuite = []
+    for test_nr, test in enumerate(generated):
+        print(f'\n=== test nr. {test_nr} ===\n')
+        for cmd in test:
+            print(cmd)
+        tests.append(test)
+    print('\nWriting to file: fuzz-testsuite.json\n')
+    with open('fuzz-testsuite.json', 'w') as file:
+        json.dump(tests, file, indent=4)
+    end_time = time.time()
+    print(f"Execution time: {end_time - start_time:.3f} seconds")
+    return tests
+
+
+def iter_tests(spec: Optional[str] = None, test_suite_size: Optional[int] = None, test_size: Optional[int] = None,
+               workers: Optional[int] = None, seed: Optional[int] = None) -> Iterator[Test]:
+    """Generates tests as described for `generate_tests`, except that each test is yielded as soon
+    as it has been generated, and the tests are neither printed nor stored in a file.
+    This allows a test to be executed while the next is being generated, e.g.:
+
+        for test in append_tests(iter_tests(spec), 'fuzz-testsuite.jsonl'):
+            execute(test)
+
+    :param spec: an optional specification of constraints.
+    :param test_suite_size: an optional number indicating number of tests to generate.
+    :param test_size: an optional number of commands to generate in each test.
+    :param workers: an optional number of processes generating tests in parallel.
+    :param seed: an optional seed from which the random seed of each test is derived.
+    :return: the tests, each a list of dictionaries, each representing a command.
+    """
+    return compile_spec(spec).iter_tests(test_suite_size, test_size, workers, seed)
+
+
+def append_tests(tests: Iterable[Test], path: str) -> Iterator[Test]:
+    """Appends each of a sequence of tests to a JSONL file as soon as it is produced, as one line,
+    and yields it. The file is flushed after each test, such that the tests written so far are
+    not lost if the program stops.
+
+    :param tests: the tests, e.g. from `iter_tests`.
+    :param path: the path to the JSONL file, which is created if it does not exist.
+    :return: the tests.
+    """
+    with open(path, 'a') as file:
+        for test in tests:
+            file.write(json.dumps(test) + '\n')
+            file.flush()
+            yield test
+
+
+def compile_spec(spec: Optional[str] = None) -> 'CompiledSpec':
+    """Compiles a specification, such that tests can be verified against it, and generated
+    from it, without parsing it again.
+
+    The specification is the concatenation of two specification files:
+    1) the specification extracted from the specification file identified by
+    the configuration file, or "" if not identified.
+    2) the specification provided as argument, if provided, or "" if `None`.
+
+    :param spec: an optional specification of constraints.
+    :return: the compiled specification.
+    """
+    return CompiledSpec(read_spec(spec))
+
+
+class GenerationStatus(Enum):
+    """ How the generation of tests within a time budget ended
+    """
+    COMPLETE = 1          # the requested number of tests was generated
+    BUDGET_EXHAUSTED = 2  # the time budget ran out
+    INCONSISTENT = 3      # the specification has no tests of the requested size
+
+
+@dataclass
+class GenerationReport:
+    """The result of generating tests within a time budget, see `CompiledSpec.generate_within`.
+
+    Attributes:
+        tests: the tests generated.
+        status: how the generation ended.
+        attempts: the number of tests attempted generated.
+        timeouts: the number of attempts skipped because a check timed out.
+        elapsed: the time spent in seconds.
+    """
+    tests: TestSuite = field(default_factory=list)
+    status: GenerationStatus = GenerationStatus.COMPLETE
+    attempts: int = 0
+    timeouts: int = 0
+    elapsed: float = 0.0
+
+    def __str__(self) -> str:
+        return (f'{self.status.name}: {len(self.tests)} tests generated in {self.attempts} attempts, '
+                f'{self.timeouts} timed out, in {self.elapsed:.3f} seconds')
+
+
+class CompiledSpec:
+    """A specification which has been parsed, desugared and checked for wellformedness.
+    The formulas to be solved are built once per test size, when first needed.
+
+    The `Command` datatype of the current session is selected for the specification only while
+    one of its methods runs, see `selected`, such that compiled specifications selecting
+    different commands do not interfere, also when generating tests from them interleaved.
+    """
+
+    def __init__(self, spec: str):
+        """
+        :param spec: the complete specification of constraints.
+        """
+        self.spec: str = spec
+        self.ast: LTLSpec = parse_spec(spec)
+        self.formulas: Dict[Tuple[str, int, bool, bool, TemporalEncoding, TimelineEncoding], BoolRef] = {}
+        self.translations: Dict[Tuple[str, int, TemporalEncoding, TimelineEncoding], LazyTranslation] = {}
+
+    def selected(self) -> ContextManager[Session]:
+        """Returns a context manager within which the `Command` datatype of the current session
+        is the one the formulas of the specification are built from, see `commands_to_select`.
+
+        :return: the context manager.
+        """
+        return get_session().commands_selected(commands_to_select(self.ast))
+
+    def formula(self, test_size: int, skeleton: bool = False) -> BoolRef:
+        """Returns the formula to be solved for tests of a given size, built from the `Command`
+        datatype selected for the specification, see `selected`. The formulas are cached per
+        `Command` datatype, which identifies the session and the commands selected.
+
+        :param test_size: the number of commands in each test.
+        :param skeleton: if true, the formula constraining the command names only,
+          see `generate_skeleton_formula`.
+        :return: the formula as a Z3 datatype.
+        """
+        with self.selected():
+            key = (get_session().Command.name(), test_size, skeleton, Options.LAZY_UNROLLING,
+                   Options.TEMPORAL_ENCODING, Options.TIMELINE_ENCODING)
+            if key not in self.formulas:
+                if skeleton:
+                    self.formulas[key] = generate_skeleton_formula(self.ast, test_size)
+                else:
+                    self.formulas[key] = generate_smt_formula(self.ast, test_size, self.translation(test_size))
+            return self.formulas[key]
+
+    def translation(self, test_size: int) -> Optional[LazyTranslation]:
+        """Returns the lazy translation of the specification for tests of a given size,
+        if `Options.LAZY_UNROLLING` is true.
+
+        :param test_size: the number of commands in each test.
+        :return: the lazy translation, or `None` if `Options.LAZY_UNROLLING` is false.
+        """
+        if not Options.LAZY_UNROLLING:
+            return None
+        with self.selected():
+            key = (get_session().Command.name(), test_size, Options.TEMPORAL_ENCODING, Options.TIMELINE_ENCODING)
+            if key not in self.translations:
+                self.translations[key] = LazyTranslation(self.ast, test_size)
+            return self.translations[key]
+
+    def verify(self, test: Test) -> bool:
+        """Verifies that a test satisfies the specification.
+
+        Note that the constraints provided in the XML command dictionary are not checked,
+        only the specification.
+
+        :param test: the test to check against the specification.
+        :return: True iff. the test satisfies the specification.
+        """
+        return self.ast.evaluate(test)
+
+    def verify_many(self, tests: Iterable[Test]) -> List[bool]:
+        """Verifies a collection of tests against the specification.
+
+        :param tests: the tests to check against the specification.
+        :return: for each test, True iff. it satisfies the specification.
+        """
+        return [self.verify(test) for test in tests]
+
+    def generate(self, test_suite_size: Optional[int] = None, test_size: Optional[int] = None,
+                 workers: Optional[int] = None, seed: Optional[int] = None) -> TestSuite:
+        """Generates a test suite from the specification, as described for `generate_tests`,
+        except that the test suite is neither printed nor stored in a file.
+
+        :param test_suite_size: an optional number indicating number of tests to generate.
+        :param test_size: an optional number of commands to generate in each test.
+        :param workers: an optional number of processes generating tests in parallel.
+        :param seed: an optional seed from which the random seed of each test is derived.
+        :return: the testsuite, a list of lists of dictionaries, each representing a command.
+        """
+        return list(self.iter_tests(test_suite_size, test_size, workers, seed))
+
+    def iter_tests(self, test_suite_size: Optional[int] = None, test_size: Optional[int] = None,
+                   workers: Optional[int] = None, seed: Optional[int] = None) -> Iterator[Test]:
+        """Generates the tests of a test suite from the specification as `generate` does, yielding
+        each test as soon as it has been refined, and with several workers, as soon as it and all
+        tests before it have been.
+
+        :param test_suite_size: an optional number indicating number of tests to generate.
+        :param test_size: an optional number of commands to generate in each test.
+        :param workers: an optional number of processes generating tests in parallel.
+        :param seed: an optional seed from which the random seed of each test is derived.
+        :return: the tests, each a list of dictionaries, each representing a command.
+        """
+        tests = self._iter_tests(test_suite_size, test_size, workers, seed)
+        while True:
+            # The commands are selected anew for each test, as other specifications may be used in between.
+            with self.selected():
+                test = next(tests, None)
+            if test is None:
+                return
+            yield test
+
+    def _iter_tests(self, test_suite_size: Optional[int], test_size: Optional[int], workers: Optional[int],
+                    seed: Optional[int]) -> Iterator[Test]:
+        """Generates the tests of a test suite as described for `iter_tests`, where each step
+        must be taken with the commands of the specification selected."""
+        if test_suite_size is None:
+            test_suite_size: int = command_dictionary.test_suite_size
+            if test_suite_size is None:
+                raise ValueError(f"No test suite size is provided.")
+        if test_size is None:
+            test_size: int = command_dictionary.test_size
+            if test_size is None:
+                raise ValueError(f"No test size is provided.")
+        if workers is None:
+            workers = command_dictionary.workers or 1
+        if seed is None:
+            seed = command_dictionary.seed
+        if workers > 1:
+            if seed is None:
+                seed = random.randrange(2**32)
+            yield from generate_tests_in_parallel(self.spec, test_suite_size, test_size, workers, seed)
+            return
+        smt_formula: BoolRef = self.formula(test_size)
+        translation: Optional[LazyTranslation] = self.translation(test_size)
+        if Options.INCREMENTAL_SOLVING:
+            yield from generate_tests_incrementally(self.ast, smt_formula, test_suite_size, test_size, seed, translation)
+            return
+        skeleton_formula: Optional[BoolRef] = self.formula(test_size, True) if Options.TWO_PHASE_SOLVING else None
+        for test_nr in range(test_suite_size):
+            print(f"Generating test number {test_nr}")
+            if seed is not None:
+                random.seed(seed + test_nr)
+            yield generate_test(self.ast, smt_formula, test_size, fresh_context=seed is not None,
+                                skeleton_formula=skeleton_formula, translation=translation)
+
+    def generate_within(self, time_budget: float, test_suite_size: Optional[int] = None,
+                        test_size: Optional[int] = None, seed: Optional[int] = None) -> GenerationReport:
+        """Generates tests from the specification until a time budget is exhausted, or until
+        `test_suite_size` tests have been generated, if provided.
+
+        Building the formula counts towards the budget. Each check of a solver times out after
+        `Options.CHECK_TIMEOUT` milliseconds, and at the latest when the budget runs out. A test
+        for which a check times out is skipped, and the next test is attempted with the next seed.
+        The tests are generated one at a time, attempt number `i` with the random seed `seed + i`
+        in a fresh Z3 context, so workers and `Options.INCREMENTAL_SOLVING` are not used.
+        The budget can be exceeded by the refinement of the last test.
+
+        :param time_budget: the time budget in seconds.
+        :param test_suite_size: an optional maximal number of tests to generate.
+        :param test_size: an optional number of commands to generate in each test.
+        :param seed: an optional seed from which the random seed of each attempt is derived.
+        :return: the tests generated, and how the generation ended.
+        """
+        with self.selected():
+            return self._generate_within(time_budget, test_suite_size, test_size, seed)
+
+    def _generate_within(self, time_budget: float, test_suite_size: Optional[int], test_size: Optional[int],
+                         seed: Optional[int]) -> GenerationReport:
+        """Generates tests within a time budget as described for `generate_within`,
+        with the commands of the specification selected."""
+        start_time = time.time()
+        deadline = start_time + time_budget
+        if test_size is None:
+            test_size: int = command_dictionary.test_size
+            if test_size is None:
+                raise ValueError(f"No test size is provided.")
+        if seed is None:
+            seed = command_dictionary.seed
+            if seed is None:
+                seed = random.randrange(2**32)
+        smt_formula: BoolRef = self.formula(test_size)
+        translation: Optional[LazyTranslation] = self.translation(test_size)
+        skeleton_formula: Optional[BoolRef] = self.formula(test_size, True) if Options.TWO_PHASE_SOLVING else None
+        report = GenerationReport()
+        while test_suite_size is None or len(report.tests) < test_suite_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                report.status = GenerationStatus.BUDGET_EXHAUSTED
+                break
+            timeout = max(1, int(remaining * 1000))
+            if Options.CHECK_TIMEOUT is not None:
+                timeout = min(timeout, Options.CHECK_TIMEOUT)
+            print(f"Generating test number {len(report.tests)}")
+            random.seed(seed + report.attempts)
+            report.attempts += 1
+            result, test = solve_test(self.ast, smt_formula, test_size, True, skeleton_formula, translation, timeout)
+            if result == sat:
+                report.tests.append(test)
+            elif result == unsat:
+                report.status = GenerationStatus.INCONSISTENT
+                break
+            else:
+                debug(1, f'attempt {report.attempts} timed out, skipping it')
+                report.timeouts += 1
+        report.elapsed = time.time() - start_time
+        return report
+
+
+def read_spec(spec: Optional[str]) -> str:
+    """Returns the specification in the specification file identified by the configuration
+    file, if any, followed by the specification provided as argument, if any.
+
+    :param spec: an optional specification of constraints.
+    :return: the complete specification.
+    """
     config_spec: str = ''
     spec_file = command_dictionary.spec_file
     if spec_file is not None:
@@ -235,63 +685,439 @@ def generate_tests(spec: Optional[str] = None, test_suite_size: Optional[int] =
                 config_spec = file.read()
         except:
             raise ValueError(f"Specification file {spec_file} cannot be read or does not exist.")
-    spec = config_spec + '\n\n' + (spec or '')
-    if test_suite_size is None:
-        test_suite_size: int = command_dictionary.test_suite_size
-        if test_suite_size is None:
-            raise ValueError(f"No test suite size is provided.")
-    if test_size is None:
-        test_size: int = command_dictionary.test_size
-        if test_size is None:
-            raise ValueError(f"No test size is provided.")
-    smt_rng_formula: BoolRef = command_dictionary.generate_smt_constraint(test_size)
-    ast: LTLSpec = parse_spec(spec)
-    smt_ltl_formula: BoolRef = ast.to_smt(test_size)
+    return config_spec + '\n\n' + (spec or '')
+
+
+def commands_to_select(ast: LTLSpec) -> Optional[set[str]]:
+    """Returns the names of the commands to be represented by constructors of the `Command` datatype
+    according to `Options.COMMAND_SUBSET`, see `Session.select_commands`. With `CommandSubset.REFERENCED`
+    these are the commands named in the specification, and those having a field mentioned in any-match
+    formulas.
+
+    :param ast: the specification of constraints.
+    :return: the names of the commands, or `None` if all commands are to be represented.
+    """
+    if Options.COMMAND_SUBSET == CommandSubset.REFERENCED:
+        any_args = ast.get_any_args()
+        return ast.get_command_names() | {
+            cmd.name for cmd in command_dictionary.commands if any(arg.name in any_args for arg in cmd.arguments)}
+    return None
+
+
+def generate_smt_formula(ast: LTLSpec, end_time: int, translation: Optional[LazyTranslation] = None) -> BoolRef:
+    """Generates the formula to be solved: the range constraints from the command
+    dictionary together with the constraints from the specification.
+
+    :param ast: the specification of constraints.
+    :param end_time: the end time of the timeline.
+    :param translation: an optional lazy translation of the specification, in which case only
+      the rules which are not lazy are included, see `LazySolver`.
+    :return: the formula as a Z3 datatype.
+    """
+    smt_rng_formula: BoolRef = command_dictionary.generate_smt_constraint(end_time)
+    smt_ltl_formula: BoolRef = ast.to_smt(end_time) if translation is None else translation.formula
     if Options.PRINT_CONSTRAINTS:
         headline('FORMULA FROM SPEC ONLY')
         print(smt_ltl_formula)
-    smt_formula: BoolRef = And(smt_rng_formula, smt_ltl_formula)
-    tests: list[Test] = []
-    for test_nr in range(test_suite_size):
-        print(f"Generating test number {test_nr}")
-        test = generate_test(ast, smt_formula, test_size)
-        tests.append(test)
-    for test_nr, test in enumerate(tests):
-        print(f'\n=== test nr. {test_nr} ===\n')
-        for cmd in test:
-            print(cmd)
-    print('\nWriting to file: fuzz-testsuite.json\n')
-    with open('fuzz-testsuite.json', 'w') as file:
-        json.dump(tests, file, indent=4)
-    end_time = time.time()
-    print(f"Execution time: {end_time - start_time:.3f} seconds")
-    return tests
+    return And(smt_rng_formula, smt_ltl_formula)
+
+
+def generate_skeleton_formula(ast: LTLSpec, end_time: int) -> BoolRef:
+    """Generates the formula constraining the `skeleton` of command names of a test, abstracting
+    from arguments, such that it is implied by the formula generated by `generate_smt_formula`.
+
+    :param ast: the specification of constraints.
+    :param end_time: the end time of the timeline.
+    :return: the formula as a Z3 datatype.
+    """
+    smt_skeleton_formula: BoolRef = ast.to_smt(end_time, skeleton=True)
+    if Options.PRINT_CONSTRAINTS:
+        headline('SKELETON FORMULA FROM SPEC ONLY')
+        print(smt_skeleton_formula)
+    return smt_skeleton_formula
+
+
+def generate_tests_in_parallel(spec: str, test_suite_size: int, end_time: int, workers: int, seed: int) -> Iterator[Test]:
+    """Generates the tests of a test suite with a pool of worker processes.
 
+    The workers are started with the `spawn` method, such that each has its own Z3 context,
+    command dictionary and `Command` datatype, created from the configuration file of the current session.
+    Each worker parses the specification and builds the formula once, and then generates tests
+    with a fresh solver and Z3 context per test, test number `i` using the random seed `seed + i`.
+    The tests are yielded in test number order.
+
+    :param spec: the specification of constraints.
+    :param test_suite_size: the number of tests to generate.
+    :param end_time: the end time of the timeline.
+    :param workers: the number of worker processes.
+    :param seed: the seed from which the random seed of each test is derived.
+    :return: the resulting tests.
+    """
+    options = {name: value for name, value in vars(Options).items() if name.isupper()}
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=initialize_worker,
+                             initargs=(get_session().config_path, spec, end_time, options)) as executor:
+        test_nrs = range(test_suite_size)
+        seeds = [seed + test_nr for test_nr in test_nrs]
+        yield from executor.map(generate_test_in_worker, test_nrs, seeds)
+
+
+# State of a worker process: the specification, the formula, the skeleton formula if any,
+# the lazy translation if any, and the end time.
+worker_state: Optional[tuple[LTLSpec, BoolRef, Optional[BoolRef], Optional[LazyTranslation], int]] = None
+
+
+def initialize_worker(config_path: str, spec: str, end_time: int, options: dict):
+    """Initializes a worker process by creating its session, parsing the specification
+    and building the formula.
+
+    :param config_path: the path to the configuration file of the session.
+    :param spec: the specification of constraints.
+    :param end_time: the end time of the timeline.
+    :param options: the values of the `Options` fields in the parent process.
+    """
+    global worker_state
+    for name, value in options.items():
+        setattr(Options, name, value)
+    initialize(config_path)
+    ast: LTLSpec = parse_spec(spec)
+    get_session().select_commands(commands_to_select(ast))
+    skeleton_formula = generate_skeleton_formula(ast, end_time) if Options.TWO_PHASE_SOLVING else None
+    translation = LazyTranslation(ast, end_time) if Options.LAZY_UNROLLING else None
+    worker_state = (ast, generate_smt_formula(ast, end_time, translation), skeleton_formula, translation, end_time)
+
+
+def generate_test_in_worker(test_nr: int, seed: int) -> Test:
+    """Generates one test in a worker process.
+
+    :param test_nr: the number of the test in the test suite.
+    :param seed: the random seed for the test.
+    :return: the resulting test.
+    """
+    ast, smt_formula, skeleton_formula, translation, end_time = worker_state
+    print(f"Generating test number {test_nr}")
+    random.seed(seed)
+    return generate_test(ast, smt_formula, end_time, fresh_context=True, skeleton_formula=skeleton_formula,
+                         translation=translation)
 
-def generate_test(ast: LTLSpec, smt_formula: BoolRef, end_time: int) -> Test:
+
+def generate_test(ast: LTLSpec, smt_formula: BoolRef, end_time: int, fresh_context: bool = False,
+                  skeleton_formula: Optional[BoolRef] = None, translation: Optional[LazyTranslation] = None) -> Test:
     """Generates one test.
 
+    If a skeleton formula is provided, the command names of the test are solved from it first,
+    and the formula is then solved with the command names fixed, if possible, see `solve_formula`.
+
+    The model found by Z3 depends not only on the formula, but also on the history of the
+    Z3 context in which it is solved. If `fresh_context` is true, the formula is therefore
+    solved in a new Z3 context, such that the test only depends on the formula and the
+    state of the Python random number generator.
+
     :param ast: the specification of constraints.
     :param smt_formula: the formula as a Z3 datatype.
     :param end_time: the end time of the timeline.
+    :param fresh_context: if true, the formula is solved in a new Z3 context.
+    :param skeleton_formula: an optional formula constraining the command names only.
+    :param translation: the lazy translation of the specification, if the formula only contains
+      the rules which are not lazy, see `LazySolver`.
     :return: the resulting test.
     """
-    solver = Solver()
-    if solve_formula(solver, smt_formula, end_time) is not None:
-        if Options.PRINT_CONSTRAINTS:
-            headline("ALL CONSTRAINTS")
-            print(solver.assertions())
-        extract_and_verify_test(ast, solver.model(), end_time)
-        if Options.REFINEMENT_STRATEGY == RefinementStrategy.EVAL:
-            test = refine_solver_using_evaluate(ast, solver, end_time)
-        elif Options.REFINEMENT_STRATEGY == RefinementStrategy.EVAL_PER_ARG:
-            test = refine_solver_using_evaluate_per_arg(ast, solver, end_time)
-        else:
-            test = refine_solver_using_to_smt(ast, solver, end_time)
-        return test
+    result, test = solve_test(ast, smt_formula, end_time, fresh_context, skeleton_formula, translation)
+    if result != sat:
+        exit_unsolved(result)
+    return test
+
+
+def exit_unsolved(result: CheckSatResult):
+    """Terminates the program after a check which did not find a test, reporting why.
+
+    :param result: the result of the check, `unsat` or `unknown`.
+    """
+    if result == unknown:
+        print(f"No test was found within the timeout of {Options.CHECK_TIMEOUT} ms per check!")
     else:
         print("The specification must contain inconsistent constraints!")
-        sys.exit(1)
+    sys.exit(1)
+
+
+def solve_test(ast: LTLSpec, smt_formula: BoolRef, end_time: int, fresh_context: bool = False,
+               skeleton_formula: Optional[BoolRef] = None, translation: Optional[LazyTranslation] = None,
+               timeout: Optional[int] = None) -> Tuple[CheckSatResult, Optional[Test]]:
+    """Generates one test as described for `generate_test`, except that failure is returned
+    rather than terminating the program.
+
+    :param ast: the specification of constraints.
+    :param smt_formula: the formula as a Z3 datatype.
+    :param end_time: the end time of the timeline.
+    :param fresh_context: if true, the formula is solved in a new Z3 context.
+    :param skeleton_formula: an optional formula constraining the command names only.
+    :param translation: the lazy translation of the specification, if the formula only contains
+      the rules which are not lazy, see `LazySolver`.
+    :param timeout: the timeout of each check, see `new_solver`.
+    :return: `sat` and the resulting test, or `unsat` and `None` if the formula has no model,
+      or `unknown` and `None` if the check was inconclusive, typically because it timed out.
+    """
+    names = solve_skeleton(skeleton_formula, end_time, fresh_context, timeout) if skeleton_formula is not None else None
+    solver = new_solver(fresh_context, translation, timeout)
+    if solve_formula(solver, smt_formula, end_time, names) is None:
+        return (unknown if solver.reason_unknown() else unsat), None
+    if Options.PRINT_CONSTRAINTS:
+        headline("ALL CONSTRAINTS")
+        print(solver.assertions())
+    extract_and_verify_test(ast, get_model(solver), end_time)
+    return sat, refine_test(ast, solver, end_time)
+
+
+def generate_tests_incrementally(ast: LTLSpec, smt_formula: BoolRef, test_suite_size: int, end_time: int,
+                                 seed: Optional[int] = None, translation: Optional[LazyTranslation] = None) -> Iterator[Test]:
+    """Generates the tests of a test suite using one solver for all tests.
+
+    The formula is asserted once, and each test is generated inside a `push()`/`pop()` scope,
+    such that the constraints added during refinement of one test do not affect the next.
+    If `Options.DIVERSITY_CONSTRAINTS` is true, each test is in addition required to differ
+    from all previously generated tests in at least one command name. These constraints are
+    guarded by an assumption literal, and are dropped for a test if they cannot be satisfied.
+    Otherwise they are asserted while the test is refined, such that the refined test differs as well.
+
+    :param ast: the specification of constraints.
+    :param smt_formula: the formula as a Z3 datatype.
+    :param test_suite_size: the number of tests to generate.
+    :param end_time: the end time of the timeline.
+    :param seed: an optional seed from which the random seed of each test is derived.
+    :param translation: the lazy translation of the specification, if the formula only contains
+      the rules which are not lazy, see `LazySolver`.
+    :return: the resulting tests.
+    """
+    solver = new_solver(False, translation)
+    solver.add(smt_formula)
+    if Options.PRINT_CONSTRAINTS:
+        headline("ALL CONSTRAINTS")
+        print(solver.assertions())
+    diversity = Bool('diversity')
+    previous_names = set()
+    for test_nr in range(test_suite_size):
+        print(f"Generating test number {test_nr}")
+        if seed is not None:
+            random.seed(seed + test_nr)
+        if Options.RANDOMIZED_SOLVING:
+            randomize_solver(solver)
+        solver.push()
+        diverse = False
+        if Options.DIVERSITY_CONSTRAINTS:
+            # Asserted rather than assumed, such that refinement keeps the test apart from the previous ones.
+            solver.push()
+            solver.add(diversity)
+            diverse = check_test(solver, end_time) == sat
+            if not diverse:
+                debug(1, 'diversity constraints cannot be satisfied, dropping them for this test')
+                solver.pop()
+        if not diverse:
+            result = check_test(solver, end_time)
+            if result != sat:
+                exit_unsolved(result)
+        model = solver.model()
+        if Options.DEBUG_LEVEL >= 1:
+            print_model(model, end_time)
+        unrefined_test = extract_and_verify_test(ast, model, end_time)
+        test = refine_test(ast, solver, end_time)
+        names = tuple(cmd['name'] for cmd in test)
+        if diverse and names in previous_names:
+            # The evaluation-based refinements rewrite commands outside the solver and may undo the diversity.
+            debug(1, 'refined test repeats the command names of a previous test, keeping the unrefined test')
+            test = unrefined_test
+            names = tuple(cmd['name'] for cmd in test)
+        if diverse:
+            solver.pop()
+        solver.pop()
+        if Options.DIVERSITY_CONSTRAINTS:
+            solver.add(Implies(diversity, block_command_names(test)))
+            previous_names.add(names)
+        yield test
+
+
+def block_command_names(test: Test) -> BoolRef:
+    """Returns a constraint stating that the timeline differs from a test in at least one command name.
+
+    :param test: the test to differ from.
+    :return: the constraint.
+    """
+    return Or([Not(smt_is_command(command_dictionary.smt_constructor_name(cmd["name"]), i)) for i, cmd in enumerate(test)])
+
+
+def refine_test(ast: LTLSpec, solver: Solver, end_time: int) -> Test:
+    """Refines the current model of a solver according to `Options.REFINEMENT_STRATEGY`.
+
+    :param ast: the specification of constraints.
+    :param solver: the solver, which must be in a satisfiable state.
+    :param end_time: the end time of the timeline.
+    :return: the refined test.
+    """
+    if Options.REFINEMENT_STRATEGY == RefinementStrategy.EVAL:
+        return refine_solver_using_evaluate(ast, solver, end_time)
+    elif Options.REFINEMENT_STRATEGY == RefinementStrategy.EVAL_PER_ARG:
+        return refine_solver_using_evaluate_per_arg(ast, solver, end_time)
+    elif Options.REFINEMENT_STRATEGY == RefinementStrategy.NONE:
+        test = extract_and_verify_test(ast, get_model(solver), end_time)
+        if Options.DEBUG_LEVEL >= 1:
+            print_test(test)
+        return test
+    else:
+        return refine_solver_using_to_smt(ast, solver, end_time)
+
+
+def new_solver(fresh_context: bool = False, translation: Optional[LazyTranslation] = None,
+               timeout: Optional[int] = None) -> Solver:
+    """Creates a solver.
+
+    :param fresh_context: if true, the solver has a new Z3 context.
+    :param translation: an optional lazy translation of the specification, in which case
+      the solver is a `LazySolver`.
+    :param timeout: the timeout of each check in milliseconds, `Options.CHECK_TIMEOUT` if `None`.
+    :return: the solver.
+    """
+    solver = Solver(ctx=Context()) if fresh_context else Solver()
+    timeout = Options.CHECK_TIMEOUT if timeout is None else timeout
+    if timeout is not None:
+        solver.set('timeout', timeout)
+    if Options.RANDOMIZED_SOLVING:
+        randomize_solver(solver)
+    return solver if translation is None else LazySolver(translation, solver)
+
+
+def randomize_solver(solver: Solver):
+    """Makes the models found by a solver depend on the state of the Python random number generator:
+    the solver gets a random seed drawn from it, and starts arithmetic variables at random values,
+    rather than at the defaults of Z3. Used if `Options.RANDOMIZED_SOLVING` is true.
+
+    :param solver: the solver.
+    """
+    solver.set('random_seed', random.randrange(2**31))
+    solver.set('arith.random_initial_value', True)
+
+
+def check_test(solver: Solver, end_time: int, *assumptions: BoolRef) -> CheckSatResult:
+    """Checks a solver for a test under some assumptions. If `Options.RANDOMIZED_SOLVING` is true,
+    it is in addition assumed that the command at each time point has a random name, since Z3 would
+    otherwise tend to choose the same command names for every test. The assumed names in the unsat
+    core of each failed check are dropped, until the check succeeds or the core contains none of them.
+
+    :param solver: the solver.
+    :param end_time: the end time of the timeline.
+    :param assumptions: the assumptions, in the context of the solver.
+    :return: the result of the last check.
+    """
+    if not Options.RANDOMIZED_SOLVING:
+        return solver.check(*assumptions)
+    names = [command_dictionary.smt_constructor_name(command.name) for command in command_dictionary.commands]
+    hints: List[BoolRef] = []
+    for t in range(end_time):
+        hint = FreshBool('hint')
+        add_constraint(solver, Implies(hint, smt_is_command(random.choice(names), t)))
+        hints.append(hint if solver.ctx is main_ctx() else hint.translate(solver.ctx))
+    while True:
+        result = solver.check(*assumptions, *hints)
+        if result != unsat:
+            return result
+        core = {str(literal) for literal in solver.unsat_core()}
+        remaining = [hint for hint in hints if str(hint) not in core]
+        if len(remaining) == len(hints):
+            return result
+        debug(2, f'dropping {len(hints) - len(remaining)} of {len(hints)} assumed command names')
+        hints = remaining
+
+
+class LazySolver:
+    """A solver for the formula of a lazy translation of a specification (see `LazyTranslation`),
+    which adds the instances of the lazy rules on demand: each time `check` finds a model, the
+    instances violated by the test extracted from the model are added, and the check is repeated,
+    until no instance is violated. Instances added inside a `push()`/`pop()` scope are removed with it.
+    Otherwise the solver behaves as a Z3 solver.
+
+    Attributes:
+        translation: the lazy translation.
+        solver: the underlying Z3 solver.
+        ctx: the Z3 context of the solver.
+        instances: the instances added to the solver.
+        definitions: the number of definitions of auxiliary variables added to the solver.
+        scopes: the number of instances and definitions added when each open scope was pushed.
+    """
+
+    def __init__(self, translation: LazyTranslation, solver: Solver):
+        self.translation = translation
+        self.solver = solver
+        self.ctx: Context = solver.ctx
+        self.instances: list[tuple[int, int]] = []
+        self.definitions: int = 0
+        self.scopes: list[tuple[int, int]] = []
+
+    def add(self, *constraints: BoolRef):
+        self.solver.add(*constraints)
+
+    def push(self):
+        self.scopes.append((len(self.instances), self.definitions))
+        self.solver.push()
+
+    def pop(self):
+        self.solver.pop()
+        instances, self.definitions = self.scopes.pop()
+        del self.instances[instances:]
+
+    def check(self, *assumptions: BoolRef) -> CheckSatResult:
+        while True:
+            result = self.solver.check(*assumptions)
+            if result != sat:
+                return result
+            model = get_model(self.solver)
+            test = extract_test(model, self.translation.end_time)
+            added = set(self.instances)
+            violated = [instance for instance in self.translation.violations(test) if instance not in added]
+            if not violated:
+                return result
+            debug(2, f'adding {len(violated)} violated rule instances to the {len(added)} added')
+            constraints = [self.translation.instance(*instance) for instance in violated]
+            constraints += self.translation.definitions[self.definitions:]
+            add_constraint(self.solver, And(constraints))
+            self.instances += violated
+            self.definitions = len(self.translation.definitions)
+
+    def model(self) -> ModelRef:
+        return self.solver.model()
+
+    def set(self, *args, **keys):
+        self.solver.set(*args, **keys)
+
+    def unsat_core(self) -> AstVector:
+        return self.solver.unsat_core()
+
+    def reason_unknown(self) -> str:
+        return self.solver.reason_unknown()
+
+    def assertions(self) -> AstVector:
+        return self.solver.assertions()
+
+
+def add_constraint(solver: Solver, constraint: BoolRef):
+    """Adds a constraint to a solver, translating it to the context of the solver if needed.
+
+    :param solver: the solver.
+    :param constraint: the constraint, built in the main Z3 context.
+    """
+    if solver.ctx is not main_ctx():
+        constraint = constraint.translate(solver.ctx)
+    solver.add(constraint)
+
+
+def get_model(solver: Solver) -> ModelRef:
+    """Returns the model of a solver, translated to the main Z3 context if needed.
+
+    :param solver: the solver, which must be in a satisfiable state.
+    :return: the model.
+    """
+    model = solver.model()
+    if solver.ctx is not main_ctx():
+        model = model.translate(main_ctx())
+    return model
 
 
 def extract_and_verify_test(ast: LTLSpec, model: ModelRef, end_time: int) -> Test:
@@ -302,7 +1128,7 @@ def extract_and_verify_test(ast: LTLSpec, model: ModelRef, end_time: int) -> Tes
     :param end_time: the end time of the timeline.
     :return: the resulting test.
     """
-    test = [extract_command(model.eval(timeline(i)), model) for i in range(end_time)]
+    test = extract_test(model, end_time)
     if not ast.evaluate(test):
         error(f"*** generated test does not satisfy LTL semantics:\n {test}")
     return test
@@ -319,21 +1145,11 @@ def verify_test(test: Test, spec: Optional[str] = None) -> bool:
     Note that the constraints provided in the XML command dictionary are not checked,
     only the specification.
 
-    Note that the function parses the specification.
+    Note that the function parses the specification. Use `compile_spec` to verify
+    several tests against the same specification.
 
     :param test: the test to check against the specification.
     :param spec: an optional specification of constraints.
     :return: True iff. the test satisfies the specification.
     """
-    config_spec: str = ''
-    spec_file = command_dictionary.spec_file
-    if spec_file is not None:
-        try:
-            with open(spec_file, "r") as file:
-                config_spec = file.read()
-        except:
-            raise ValueError(f"Specification file {spec_file} cannot be read or does not exist.")
-    spec = config_spec + '\n\n' + (spec or '')
-    ast: LTLSpec = parse_spec(spec)
-    return ast.evaluate(test)
-
+    return compile_spec(spec).verify(test)
@@ -140,6 +140,18 @@ def lookup_dict(dictionary: dict, field: str) -> object:
         error(f"'{field}' is not a key in {dictionary}")
 
 
+def diversity(tests: TestSuite) -> float:
+    """Measures the diversity of a test suite, as the fraction of its commands which are distinct,
+    comparing command names and argument values. Repeated commands, such as commands whose arguments
+    all have default values, as well as repeated tests, lower the diversity.
+
+    :param tests: the test suite.
+    :return: the diversity, between 0 and 1, where 1 means that no command is repeated.
+    """
+    commands = [tuple(sorted(command.items())) for test in tests for command in test]
+    return len(set(commands)) / len(commands) if commands else 1.0
+
+
 def limits_unsigned_int(bits: int):
     """Returns the minimum and maximum values for an unsigned integer of a given number of bits.
 
@@ -0,0 +1,61 @@
+"""
+Compares the translations of temporal operators to Z3 (`TemporalEncoding`) on rules of
+different shapes and tests of different sizes: the time to build the formula, the size of
+the part translated from the specification, and the time to solve the formula. Run from the `tests` directory, such that the configuration
+file `fuzz_config.json` is found.
+"""
+
+import sys
+import time
+
+from z3 import Solver, AstRef
+
+from fuzz import compile_spec, Options, TemporalEncoding
+
+RULES = {
+    'always': 'rule r: always TURN(angle=a?) => -10 <= a <= 10',
+    'always next': 'rule r: always any(time=t1?) => wnext any(time=t2?) => t1 < t2',
+    'always eventually': 'rule r: always MOVE(number=n?) => eventually STOP(number=n)',
+    'always until': 'rule r: always ALIGN() => next (!STOP() until MOVE())',
+    'always sofar': 'rule r: always STOP() => sofar !TURN()',
+    'count': 'rule r: count 2 ALIGN()',
+}
+
+SIZES = [10, 100, 1000]
+
+TIMEOUT = 60000  # milliseconds per solver check
+
+
+def formula_size(formula: AstRef) -> int:
+    """Returns the number of distinct subterms of a formula."""
+    seen = set()
+    todo = [formula]
+    while todo:
+        term = todo.pop()
+        if term.get_id() not in seen:
+            seen.add(term.get_id())
+            todo.extend(term.children())
+    return len(seen)
+
+
+def benchmark(spec: str, size: int, encoding: TemporalEncoding) -> str:
+    Options.TEMPORAL_ENCODING = encoding
+    compiled = compile_spec(spec)
+    start = time.time()
+    formula = compiled.formula(size)
+    translated = time.time()
+    solver = Solver()
+    solver.set('timeout', TIMEOUT)
+    solver.add(formula)
+    result = solver.check()
+    solved = time.time()
+    return f'{formula_size(compiled.ast.to_smt(size)):9} nodes {translated - start:8.2f}s {result} in {solved - translated:.2f}s'
+
+
+if __name__ == '__main__':
+    Options.DEBUG_LEVEL = 0
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for name, spec in RULES.items():
+        for size in sizes:
+            for encoding in TemporalEncoding:
+                print(f'{name:18} {size:5} {encoding.name:10} {benchmark(spec, size, encoding)}', flush=True)
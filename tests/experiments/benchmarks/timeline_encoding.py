@@ -0,0 +1,52 @@
+"""
+Compares the representations of the timeline in Z3 (`TimelineEncoding`) on the specifications
+of the demos: the time to build the formula, the time to solve it, and the time to generate
+two tests, refined with Z3. Run from the `tests` directory.
+"""
+
+import importlib
+import os
+import sys
+import time
+
+from z3 import Solver
+
+from fuzz import compile_spec, Options, TimelineEncoding, RefinementStrategy
+from fuzz.commands import initialize
+
+DEMOS = ['demo1.fit', 'demo2.fit', 'demo3.fit', 'demo4.fit1', 'demo6.fit', 'demo7.fit', 'demo8.fit', 'demo9.fit']
+
+SIZES = [10, 30]
+
+TIMEOUT = 60000  # milliseconds per solver check
+
+
+def benchmark(spec: str, size: int, encoding: TimelineEncoding) -> str:
+    Options.TIMELINE_ENCODING = encoding
+    compiled = compile_spec(spec)
+    start = time.time()
+    formula = compiled.formula(size)
+    translated = time.time()
+    solver = Solver()
+    solver.set('timeout', TIMEOUT)
+    solver.add(formula)
+    result = solver.check()
+    solved = time.time()
+    compiled.generate(test_suite_size=2, test_size=size, seed=1)
+    generated = time.time()
+    return f'{translated - start:6.2f}s {result} in {solved - translated:6.2f}s, generated in {generated - solved:6.2f}s'
+
+
+if __name__ == '__main__':
+    Options.DEBUG_LEVEL = 0
+    Options.REFINEMENT_STRATEGY = RefinementStrategy.SMT
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    tests_dir = os.getcwd()
+    for demo in DEMOS:
+        module = importlib.import_module(demo)
+        os.chdir(os.path.join(tests_dir, demo.split('.')[0]))
+        initialize()
+        for size in sizes:
+            for encoding in TimelineEncoding:
+                print(f'{demo:11} {size:4} {encoding.name:8} {benchmark(module.spec, size, encoding)}', flush=True)
+        os.chdir(tests_dir)
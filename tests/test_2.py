@@ -0,0 +1,421 @@
+import json
+import os
+from dataclasses import fields, is_dataclass
+
+import pytest
+
+from tests.test_utils import *
+
+"""
+These examples test the alternative ways of generating tests, controlled by `Options`.
+"""
+
+SPEC = """
+rule stop: always MOVE(number=n?) => eventually STOP(number=n)
+rule two_align: count 2 ALIGN()
+rule limit_degree: always TURN(angle=a?) => -10 <= a <= 10
+rule time_moves_forward: always any(time=t1?) => wnext any(time=t2?) => t1 < t2
+"""
+
+
+def test_incremental_solving():
+    with options(INCREMENTAL_SOLVING=True):
+        run(SPEC)
+
+
+def test_incremental_solving_with_diversity():
+    for strategy in RefinementStrategy:
+        with options(INCREMENTAL_SOLVING=True, DIVERSITY_CONSTRAINTS=True, REFINEMENT_STRATEGY=strategy):
+            tests = generate_tests(SPEC, test_suite_size=8, test_size=3)
+        names = [tuple(cmd['name'] for cmd in test) for test in tests]
+        assert len(set(names)) == len(names), strategy
+
+
+def test_parallel_generation_is_reproducible():
+    sequential = generate_tests(SPEC, test_suite_size=4, test_size=TEST_SIZE, workers=1, seed=42)
+    parallel = generate_tests(SPEC, test_suite_size=4, test_size=TEST_SIZE, workers=2, seed=42)
+    assert sequential == parallel
+
+
+def test_recurrence_encoding():
+    with options(TEMPORAL_ENCODING=TemporalEncoding.RECURRENCE):
+        run(SPEC)
+        run("""
+        rule r: always (MOVE() => eventually STOP())
+        rule s: always (PIC() => once ALIGN())
+        rule u: always (SEND() => TURN() until LOG())
+        rule v: always (CANCEL() => sofar !PIC())
+        """)
+
+
+def test_recurrence_encoding_agrees_with_unrolling():
+    from fuzz.solver import new_solver
+    specs = [
+        "rule r: always ((MOVE() => eventually STOP()) and (TURN() => eventually ALIGN()))\n"
+        "rule s: STOP() and always !ALIGN()",
+        "rule r: always (MOVE() => (TURN() until (ALIGN() until STOP())))\n"
+        "rule s: eventually (PIC() and eventually SEND())",
+        "rule r: always (MOVE() => eventually STOP())\n"
+        "rule s: eventually MOVE() and always !STOP()",
+    ]
+    for spec in specs:
+        compiled = compile_spec(spec)
+        results = []
+        for encoding in [TemporalEncoding.UNROLL, TemporalEncoding.RECURRENCE]:
+            with options(TEMPORAL_ENCODING=encoding):
+                solver = new_solver()
+                solver.add(compiled.formula(5))
+                results.append(solver.check())
+        assert results[0] == results[1]
+
+
+def test_smt_translation_is_memoized():
+    from fuzz import ltl_ast
+    from fuzz.ltl_grammar import parse_spec
+    ast = parse_spec("rule r: always (MOVE() => eventually STOP())")
+    formula = ast.to_smt(TEST_SIZE)
+    assert ltl_ast.smt_context.hits > 0
+    assert formula.eq(ast.to_smt(TEST_SIZE))
+
+
+def test_count_ranges():
+    run("""
+    rule a: count (2,3) MOVE()
+    rule b: always (STOP() => countpast (1,2) ALIGN())
+    rule c: count 0 CANCEL()
+    rule d: countpast 1 SEND()
+    """)
+
+
+def test_desugared_rules_contain_no_derived_formulas():
+    from fuzz.ltl_ast import ASTNode, LTLDerivedFormula
+    from fuzz.ltl_grammar import parse_spec
+
+    def derived(node) -> bool:
+        if isinstance(node, LTLDerivedFormula):
+            return True
+        children = [getattr(node, f.name) for f in fields(node)] if is_dataclass(node) else []
+        return any(derived(child) for child in children if isinstance(child, ASTNode))
+
+    spec = """
+    rule a: MOVE() then STOP()
+    rule b: ALIGN() after TURN()
+    rule c: always (PIC() => next 3 [SEND(images=i?)] 0 < i < 10)
+    """
+    ast = parse_spec(spec)
+    assert all(derived(rule.formula) for rule in ast.rules)
+    assert not any(derived(rule.core) for rule in ast.rules)
+    run(spec)
+
+
+def test_vector_evaluation_of_long_tests():
+    from fuzz.ltl_grammar import parse_spec
+    ast = parse_spec("rule r: always (MOVE() => eventually STOP()) and always (STOP() => once MOVE())")
+    test = [{'name': 'MOVE'}, {'name': 'STOP'}] * 1500
+    for strategy in (EvaluationStrategy.VECTOR, EvaluationStrategy.INCREMENTAL):
+        with options(EVALUATION_STRATEGY=strategy):
+            assert ast.evaluate(test)
+            assert not ast.evaluate(test + [{'name': 'MOVE'}])
+    with options(EVALUATION_STRATEGY=EvaluationStrategy.VECTOR):
+        run(SPEC)
+
+
+def test_incremental_evaluation():
+    from fuzz.ltl_ast import IncrementalEvaluator
+    from fuzz.ltl_grammar import parse_spec
+    ast = parse_spec("""
+    rule a: always (MOVE() => eventually STOP())
+    rule b: always (STOP() => wprev (TURN() since ALIGN()))
+    """)
+    test = [{'name': 'ALIGN'}, {'name': 'TURN'}, {'name': 'MOVE'}, {'name': 'STOP'}]
+    evaluator = IncrementalEvaluator(ast, test)
+    for index, name in [(1, 'MOVE'), (3, 'LOG'), (0, 'LOG'), (2, 'STOP'), (1, 'ALIGN')]:
+        test[index] = {'name': name}
+        assert evaluator.evaluate(index) == ast.evaluate(test)
+    with options(EVALUATION_STRATEGY=EvaluationStrategy.INCREMENTAL):
+        run(SPEC)
+
+
+def test_lalr_parser_agrees_with_earley_parser():
+    from fuzz.ltl_grammar import parse_spec, get_parser
+    spec = """
+    rule a: always MOVE(number = n?) => eventually STOP(number = n) and LOG() U TURN()
+    rule b: [PIC(images = i?)] i > 2 -> once ALIGN() S SEND() & ! CANCEL() ~> LOG()
+    rule c: <TURN()> next 2 ALIGN() | count (1,2) SEND() WU PIC(quality = image_quality.low)
+    rule d: always (SEND(message = m?) => m |- /[a-z]{3}/ then prev STOP())
+    """
+    with options(PARSER=Parser.EARLEY):
+        earley_ast = parse_spec(spec)
+    with options(PARSER=Parser.LALR):
+        lalr_ast = parse_spec(spec)
+        assert get_parser('spec') is get_parser('spec')
+    assert [rule.to_str() for rule in lalr_ast.rules] == [rule.to_str() for rule in earley_ast.rules]
+    assert [rule.core for rule in lalr_ast.rules] == [rule.core for rule in earley_ast.rules]
+
+
+def test_earley_parser_is_the_default():
+    from fuzz.ltl_grammar import parse_spec
+    from fuzz.ltl_ast import LTLImplies
+    # the LALR grammar groups such chains differently, see `Parser`
+    core = parse_spec("rule r: MOVE() -> true wuntil true -> LOG() or prev MOVE()").rules[0].core
+    assert Options.PARSER == Parser.EARLEY
+    assert isinstance(core, LTLImplies) and isinstance(core.right, LTLImplies)
+
+
+def test_compiled_spec():
+    spec = compile_spec(SPEC)
+    tests = spec.generate(test_suite_size=2, test_size=TEST_SIZE)
+    assert spec.formula(TEST_SIZE) is spec.formula(TEST_SIZE)
+    assert spec.verify_many(tests) == [True, True]
+    assert not spec.verify([{'name': 'MOVE', 'number': 1}])
+    assert verify_test(tests[0], SPEC)
+
+
+def test_sessions(tmp_path):
+    from z3 import Solver, Distinct, sat
+    from fuzz.commands import get_session
+    xml_path = tmp_path / "commands.xml"
+    xml_path.write_text(open("xml/rover_commands.xml").read().replace('symbol="high"', 'symbol="medium"'))
+    config = {"cmd_files": [str(xml_path)], "test_suite_size": 1, "test_size": 3}
+    config_path = tmp_path / "fuzz_config.json"
+    config_path.write_text(json.dumps(config))
+    default_session = get_session()
+    compiled = compile_spec(SPEC)
+    assert all(compiled.verify_many(compiled.generate(test_suite_size=1, test_size=3)))
+    session = Session(str(config_path)).activate()
+    try:
+        assert get_session() is session and session.Command is not default_session.Command
+        assert all(compiled.verify_many(compiled.generate(test_suite_size=1, test_size=3)))
+        assert session.Command != default_session.Command
+        quality = session.command_dictionary.get_enum_datatype('image_quality')
+        default_quality = default_session.command_dictionary.get_enum_datatype('image_quality')
+        assert quality != default_quality
+        solver = Solver()
+        solver.add(Distinct([quality.constructor(i)() for i in range(quality.num_constructors())]))
+        solver.add(Distinct([default_quality.constructor(i)() for i in range(default_quality.num_constructors())]))
+        assert solver.check() == sat
+        tests = compile_spec("rule r: eventually STOP()").generate()
+        assert len(tests) == 1 and len(tests[0]) == 3
+    finally:
+        default_session.activate()
+    run(SPEC)
+
+
+def test_command_dictionary_cache(tmp_path, monkeypatch):
+    from fuzz import gencmds
+    assert Options.COMMAND_CACHE_DIR is None
+    xml_path = tmp_path / "commands.xml"
+    xml_path.write_text(open("xml/rover_commands.xml").read())
+    config_path = tmp_path / "fuzz_config.json"
+    config_path.write_text(json.dumps({"cmd_files": [str(xml_path)]}))
+    with options(COMMAND_CACHE_DIR=str(tmp_path / "cache")):
+        dictionary = Session(str(config_path)).command_dictionary
+        assert len(os.listdir(tmp_path / "cache")) == 1
+        assert Session(str(config_path)).command_dictionary.cmd_dict == dictionary.cmd_dict
+        xml_path.write_text(xml_path.read_text().replace('stem="LOG"', 'stem="RECORD"'))
+        cmd_dict = Session(str(config_path)).command_dictionary.cmd_dict
+        assert 'RECORD' in cmd_dict and 'LOG' not in cmd_dict
+        monkeypatch.setattr(gencmds, 'CACHE_VERSION', gencmds.CACHE_VERSION + 1)
+        assert gencmds.read_cache(str(xml_path)) is None
+        assert Session(str(config_path)).command_dictionary.cmd_dict == cmd_dict
+        assert len(os.listdir(tmp_path / "cache")) == 2
+
+
+def test_generate_commands_is_reentrant():
+    from fuzz.gencmds import generate_commands
+    with options(COMMAND_CACHE_DIR=None):
+        enum_dict, cmd_dict = generate_commands(["xml/rover_commands.xml"])
+        assert generate_commands(["xml/rover_commands.xml"]) == (enum_dict, cmd_dict)
+        assert generate_commands(["xml/rover_commands.xml", "xml/rover_commands.xml"]) == (enum_dict, cmd_dict)
+    assert set(cmd_dict) == {'MOVE', 'ALIGN', 'TURN', 'CANCEL', 'STOP', 'PIC', 'SEND', 'LOG', 'SCAN'}
+    assert enum_dict == {'image_quality': ['low', 'high'], 'speed': ['slow', 'medium', 'fast']}
+
+
+def test_parallel_parsing_of_command_files(tmp_path, monkeypatch):
+    from fuzz import gencmds
+    from fuzz.gencmds import generate_commands
+    xml = open("xml/rover_commands.xml").read()
+    first, second = tmp_path / "first.xml", tmp_path / "second.xml"
+    first.write_text(xml)
+    second.write_text(xml.replace('opcode="0x0008" stem="LOG"', 'opcode="0x0042" stem="LOG"'))
+    cmd_files = [str(first), str(second)]
+    with monkeypatch.context() as patch, options(COMMAND_CACHE_DIR=None):
+        patch.setattr(gencmds, 'ProcessPoolExecutor', None)  # parsing in parallel is opt-in
+        serial = generate_commands(cmd_files)
+    with options(COMMAND_CACHE_DIR=None, PARSE_WORKERS=2):
+        parallel = generate_commands(cmd_files)
+    assert parallel == serial
+    assert list(parallel[1]) == list(serial[1])
+    assert parallel[1]['LOG']['opcode'] == '0x0042'
+
+
+def test_command_subset():
+    from fuzz.commands import get_session
+    compiled = compile_spec("rule stop: always MOVE(number=n?) => eventually STOP(number=n)\nrule no_send: always !SEND()")
+    run_generation(compiled, COMMAND_SUBSET=CommandSubset.REFERENCED)
+    with options(COMMAND_SUBSET=CommandSubset.REFERENCED):
+        with compiled.selected():
+            assert get_session().Command.num_constructors() == 4
+        assert get_session().Command.num_constructors() == 9
+        with options(INCREMENTAL_SOLVING=True, DIVERSITY_CONSTRAINTS=True):
+            assert all(compiled.verify_many(compiled.generate(test_suite_size=3, test_size=TEST_SIZE)))
+        # generating tests from specifications selecting different commands interleaved
+        first = compile_spec("rule move: count 1 MOVE()\nrule stop: count 1 STOP()")
+        second = compile_spec("rule align: count 2 ALIGN()\nrule turn: always TURN(angle=a?) => a > 0")
+        for strategy in (RefinementStrategy.SMT, RefinementStrategy.EVAL):
+            with options(REFINEMENT_STRATEGY=strategy, INCREMENTAL_SOLVING=strategy == RefinementStrategy.SMT):
+                interleaved = zip(first.iter_tests(3, TEST_SIZE, seed=1), second.iter_tests(3, TEST_SIZE, seed=1))
+                for first_test, second_test in interleaved:
+                    assert first.verify(first_test) and second.verify(second_test)
+    with compiled.selected():
+        assert get_session().Command.num_constructors() == 9
+
+
+def test_two_phase_solving():
+    from z3 import Solver, Bool, unsat
+    from fuzz.solver import solve_formula
+    compiled = compile_spec(SPEC + "rule no_turn: always TURN(angle=a?) => a > 1000")
+    run_generation(compiled, TWO_PHASE_SOLVING=True)
+    solver = Solver()
+    model = solve_formula(solver, compiled.formula(TEST_SIZE), TEST_SIZE, ['TURN'] * TEST_SIZE)
+    assert model is not None and solver.check(Bool('fixed_skeleton')) == unsat
+
+
+def test_lazy_unrolling():
+    from z3 import sat
+    from fuzz.solver import new_solver, extract_test, get_model
+    compiled = compile_spec(SPEC + "rule no_turn_after_stop: always STOP() => sofar !TURN()")
+    assert [rule.lazy() for rule in compiled.ast.rules] == [True, False, False, True, True]
+    run_generation(compiled, LAZY_UNROLLING=True)
+    with options(LAZY_UNROLLING=True):
+        # the instances of the three lazy rules are only added when a model violates them
+        solver = new_solver(translation=compiled.translation(TEST_SIZE))
+        solver.add(compiled.formula(TEST_SIZE))
+        assert solver.check() == sat and compiled.verify(extract_test(get_model(solver), TEST_SIZE))
+        assert len(solver.instances) < 3 * TEST_SIZE
+        with options(INCREMENTAL_SOLVING=True, DIVERSITY_CONSTRAINTS=True):
+            assert all(compiled.verify_many(compiled.generate(test_suite_size=3, test_size=TEST_SIZE)))
+        with options(TEMPORAL_ENCODING=TemporalEncoding.RECURRENCE, TWO_PHASE_SOLVING=True):
+            assert all(compiled.verify_many(compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+
+
+def test_quantified_encoding():
+    compiled = compile_spec("""
+    rule two_align: count 2 ALIGN()
+    rule limit_degree: always TURN(angle=a?) => -10 <= a <= 10
+    rule no_turn_after_stop: always STOP() => sofar !TURN()
+    rule move: eventually MOVE(number=n?) => once ALIGN(number=n)
+    rule stop: STOP() until (ALIGN() and wnext !ALIGN())
+    """)
+    run_generation(compiled, TEMPORAL_ENCODING=TemporalEncoding.QUANTIFIED)
+    with options(TEMPORAL_ENCODING=TemporalEncoding.QUANTIFIED):
+        assert str(compiled.formula(TEST_SIZE, True)).count('ForAll') == 4
+        with options(TWO_PHASE_SOLVING=True):
+            assert all(compiled.verify_many(compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+
+
+def test_shared_variables_for_any_fields():
+    from fuzz import ltl_ast
+    compiled = compile_spec("rule time_moves_forward: always any(time=t1?) => wnext any(time=t2?) => t1 < t2")
+    compiled.formula(TEST_SIZE)
+    assert sorted(ltl_ast.smt_context.fields) == [('time', t) for t in range(TEST_SIZE)]
+    for encoding in TemporalEncoding:
+        with options(TEMPORAL_ENCODING=encoding):
+            assert all(compiled.verify_many(compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+
+
+def test_flat_timeline_encoding():
+    compiled = compile_spec(SPEC + """
+    rule one_high_quality_picture: count 1 PIC(quality=image_quality.high)
+    rule align: always ALIGN(angle=a?) => once TURN(angle=a)
+    """)
+    run_generation(compiled, TIMELINE_ENCODING=TimelineEncoding.FLAT)
+    with options(TIMELINE_ENCODING=TimelineEncoding.FLAT):
+        assert 'timeline' not in str(compiled.formula(TEST_SIZE))
+        with options(INCREMENTAL_SOLVING=True, DIVERSITY_CONSTRAINTS=True):
+            tests = compiled.generate(test_suite_size=3, test_size=TEST_SIZE)
+            assert all(compiled.verify_many(tests))
+            assert len({tuple(cmd['name'] for cmd in test) for test in tests}) == 3
+        with options(TWO_PHASE_SOLVING=True, LAZY_UNROLLING=True, COMMAND_SUBSET=CommandSubset.REFERENCED):
+            assert all(compiled.verify_many(compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+
+
+def test_single_pass_extraction():
+    from z3 import sat
+    from fuzz.commands import timeline
+    from fuzz.solver import new_solver, extract_test, extract_command
+    compiled = compile_spec(SPEC + "rule one_high_quality_picture: count 1 PIC(quality=image_quality.high)")
+    solver = new_solver()
+    solver.add(compiled.formula(TEST_SIZE))
+    assert solver.check() == sat
+    model = solver.model()
+    test = extract_test(model, TEST_SIZE)
+    for t, cmd in enumerate(test):
+        if model.eval(timeline(t)).decl().name() != 'OTHER':
+            assert cmd == extract_command(model.eval(timeline(t)), model)
+    assert compiled.verify(test)
+
+
+def test_batched_smt_refinement():
+    compiled = compile_spec(SPEC + "rule only_pictures_after_stop: always STOP() => always (STOP() or PIC())")
+    with options(REFINEMENT_STRATEGY=RefinementStrategy.SMT):
+        for batch_size in [1, 4, TEST_SIZE]:
+            with options(REFINEMENT_BATCH_SIZE=batch_size):
+                assert all(compiled.verify_many(compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+        with options(INCREMENTAL_SOLVING=True, LAZY_UNROLLING=True):
+            assert all(compiled.verify_many(compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+
+
+def test_randomized_solving():
+    from fuzz import diversity
+    compiled = compile_spec(SPEC)
+    with options(REFINEMENT_STRATEGY=RefinementStrategy.NONE):
+        plain = compiled.generate(test_suite_size=4, test_size=TEST_SIZE, seed=1)
+        with options(RANDOMIZED_SOLVING=True):
+            randomized = compiled.generate(test_suite_size=4, test_size=TEST_SIZE, seed=1)
+            assert all(compiled.verify_many(randomized))
+            assert randomized == compiled.generate(test_suite_size=4, test_size=TEST_SIZE, seed=1)
+            assert len({tuple(cmd['name'] for cmd in test) for test in randomized}) > 1
+            assert diversity(randomized) > diversity(plain)
+            with options(INCREMENTAL_SOLVING=True, DIVERSITY_CONSTRAINTS=True, LAZY_UNROLLING=True):
+                assert all(compiled.verify_many(compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+    assert diversity([[{'name': 'STOP'}, {'name': 'STOP'}], [{'name': 'STOP'}, {'name': 'MOVE'}]]) == 0.5
+
+
+def test_generation_within_time_budget():
+    compiled = compile_spec(SPEC)
+    report = compiled.generate_within(time_budget=600, test_suite_size=3, test_size=TEST_SIZE, seed=1)
+    assert report.status == GenerationStatus.COMPLETE and report.attempts == 3 and report.timeouts == 0
+    assert report.tests == compiled.generate(test_suite_size=3, test_size=TEST_SIZE, seed=1)
+    with options(CHECK_TIMEOUT=1):
+        report = compiled.generate_within(time_budget=2, test_size=TEST_SIZE, seed=1)
+        assert report.status == GenerationStatus.BUDGET_EXHAUSTED
+        assert report.timeouts > 0 and report.attempts == len(report.tests) + report.timeouts
+        assert all(compiled.verify_many(report.tests))
+    report = compile_spec("rule once: count 1 STOP()\nrule twice: count 2 STOP()").generate_within(600, 3, TEST_SIZE)
+    assert report.status == GenerationStatus.INCONSISTENT and report.tests == []
+
+
+def test_generation_failures_are_reported(capsys):
+    with options(CHECK_TIMEOUT=1), pytest.raises(SystemExit):
+        compile_spec(SPEC).generate(test_suite_size=1, test_size=50)
+    assert "No test was found within the timeout of 1 ms per check!" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        compile_spec("rule once: count 1 STOP()\nrule twice: count 2 STOP()").generate(1, TEST_SIZE)
+    assert "The specification must contain inconsistent constraints!" in capsys.readouterr().out
+
+
+def test_streaming_tests_to_jsonl(tmp_path):
+    from fuzz import iter_tests, append_tests
+    compiled = compile_spec(SPEC)
+    path = tmp_path / 'fuzz-testsuite.jsonl'
+    tests = compiled.iter_tests(test_suite_size=3, test_size=TEST_SIZE, seed=1)
+    for test_nr, test in enumerate(append_tests(tests, str(path))):
+        lines = path.read_text().splitlines()
+        assert len(lines) == test_nr + 1 and json.loads(lines[-1]) == test
+    streamed = [json.loads(line) for line in path.read_text().splitlines()]
+    assert streamed == compiled.generate(test_suite_size=3, test_size=TEST_SIZE, seed=1)
+    assert next(iter_tests(SPEC, test_suite_size=3, test_size=TEST_SIZE, seed=1)) == streamed[0]
+    with options(INCREMENTAL_SOLVING=True):
+        assert all(compiled.verify_many(compiled.iter_tests(test_suite_size=2, test_size=TEST_SIZE, seed=1)))
+    assert list(compiled.iter_tests(3, TEST_SIZE, workers=2, seed=1)) == streamed
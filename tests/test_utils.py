@@ -1,4 +1,6 @@
 
+from contextlib import contextmanager
+
 from fuzz import *
 
 
@@ -31,9 +33,34 @@ def run(spec, refinement_strategy: int = 0):
 
 
 
+def run_generation(compiled: CompiledSpec, **settings):
+    """Generates tests from a compiled specification with each refinement strategy under the given
+    settings of `Options`, checks that they satisfy the specification, and that generating them
+    in parallel gives the same tests as generating them sequentially."""
+    with options(**settings):
+        for strategy in RefinementStrategy:
+            with options(REFINEMENT_STRATEGY=strategy):
+                tests = compiled.generate(test_suite_size=2, test_size=TEST_SIZE, seed=1)
+                assert all(compiled.verify_many(tests)), strategy
+        assert compiled.generate(2, TEST_SIZE, workers=2, seed=1) == compiled.generate(2, TEST_SIZE, workers=1, seed=1)
+
+
 def run_test(spec, refinement_strategy: RefinementStrategy):
     old_strategy: RefinementStrategy = Options.REFINEMENT_STRATEGY
     Options.REFINEMENT_STRATEGY = refinement_strategy
     tests = generate_tests(spec, test_suite_size=TEST_SUITE_SIZE, test_size=TEST_SIZE)
     # print_tests(tests)
-    Options.REFINEMENT_STRATEGY = old_strategy
\ No newline at end of file
+    Options.REFINEMENT_STRATEGY = old_strategy
+
+
+@contextmanager
+def options(**settings):
+    """Temporarily sets fields of `Options`, e.g. `with options(INCREMENTAL_SOLVING=True): ...`"""
+    old_settings = {name: getattr(Options, name) for name in settings}
+    for name, value in settings.items():
+        setattr(Options, name, value)
+    try:
+        yield
+    finally:
+        for name, value in old_settings.items():
+            setattr(Options, name, value)